@@ -4,11 +4,19 @@ Author: Mara van der Meulen
 This file contains a class representing an agent that is
 assigned a Multi-Armed Bandit model to interact with.
 """
+from bisect import bisect_left
+from time import perf_counter
+
 import numpy as np
 
+from arm_index import ArmIndex
+from history import History
+import schedule
+from variates import Variates
+
 
 class Agent:
-    def __init__(self, mab, p):
+    def __init__(self, mab, p, rng=None, history="full", instrument=None):
         self.mab = mab
         self.p0 = p
         self.p = p
@@ -18,34 +26,52 @@ class Agent:
         # Bayesian updates
         self.exponent = 0
 
-        self.p_upd = [self.p0]
-        self.p_bay = [self.p0]
+        # Belief histories, see History for the available modes
+        self.upd_history = History(history)
+        self.bay_history = History(history)
+        self.upd_history.reset(self.p0)
+        self.bay_history.reset(self.p0)
+
+        # Elapsed time, steps may differ in size in adaptive_strategy
+        self.time_history = History(history)
+        self.time_history.reset(0.0)
+
+        # Random variates of the baseline strategy, by default shared
+        # with the MAB model
+        self.random = mab.random if rng is None else Variates(rng)
+
+        # Optional Instrumentation object recording counters and events
+        self.instrument = instrument
 
-    def bay_updates(self):
+        # Index of the arm beliefs for arm_strategy, built on first use
+        self.arm_index = None
+
+    def bay_updates(self, dt=None):
         """
-        Update the agent's belief over a single time interval of size dt
-        using Bayesian updates. See Equation 2.11 in Section 2.3.
+        Update the agent's belief over a single time interval of size dt,
+        by default mab.dt, using Bayesian updates. See Equation 2.11 in
+        Section 2.3.
         """
-        self.exponent += np.sum(self.mab.arm_rate * self.mab.x) * self.mab.dt
+        if dt is None:
+            dt = self.mab.dt
+        self.exponent += self.mab.selected_rate() * dt
         prob = self.p0 * np.exp(-self.exponent)
-        self.p_bay.append(prob / (prob + (1 - self.p0)))
+        self.p = prob / (prob + (1 - self.p0))
 
-        self.p = self.p_bay[-1]
+        self.bay_history.append(self.p)
+        self.time_history.append(self.time_history.last + dt)
 
-    def update_belief(self):
+    def update_belief(self, dt=None):
         """
-        Update the agent's belief over a single time interval of size dt
-        by adapting the previous belief. See Equation 2.12 in Section 2.3.
+        Update the agent's belief over a single time interval of size dt,
+        by default mab.dt, by adapting the previous belief. See Equation
+        2.12 in Section 2.3.
         """
-        prev = self.p_upd[-1]
-        self.p_upd.append(
-            prev
-            - (
-                prev
-                * (1 - prev)
-                * np.sum(self.mab.arm_rate * self.mab.x)
-                * self.mab.dt
-            )
+        if dt is None:
+            dt = self.mab.dt
+        prev = self.upd_history.last
+        self.upd_history.append(
+            prev - (prev * (1 - prev) * self.mab.selected_rate() * dt)
         )
 
     def reset(self):
@@ -58,28 +84,56 @@ class Agent:
         self.p = self.p0
 
         self.exponent = 0
-        self.p_bay = [self.p0]
-        self.p_upd = [self.p0]
+        self.bay_history.reset(self.p0)
+        self.upd_history.reset(self.p0)
+        self.time_history.reset(0.0)
 
         self.mab.reset()
 
+    @property
+    def p_bay(self):
+        """
+        Beliefs computed using Bayesian updates, see bay_updates.
+        """
+        return self.bay_history.values()
+
+    @property
+    def p_upd(self):
+        """
+        Beliefs computed by adapting the previous belief, see update_belief.
+        """
+        return self.upd_history.values()
+
+    @property
+    def times(self):
+        """
+        Times at which the beliefs in p_bay and p_upd were computed.
+        """
+        return self.time_history.values()
+
     def first_strategy(self):
         """
         Optimal strategy based on Theorem 1 in the paper Multi-Armed
         Exponential Bandit by [Chen et al]. Choose the arm with maximal
         expected gain, unless expected gain is negative for all arms.
         """
-        while self.p > np.min(
-            self.mab.arm_cost / (self.mab.arm_rate * self.mab.arm_payoff)
-        ):
+        inst = self.instrument
+        if inst is not None:
+            inst.start_trial(self.p0, "optimal")
+
+        threshold = self.mab.threshold()
+        while self.p > threshold:
             # Choose project i that maximizes (pi_i p - c_i / lambda_i)
-            vals = (
-                self.mab.arm_rate * self.p
-                - self.mab.arm_cost / self.mab.arm_rate
-            )
-            i = np.argmax(vals)
+            i = self.mab.best_arm(self.p)
             self.mab.select_arm(i)
 
+            if inst is not None and inst.timing:
+                if self._timed_step(inst, i):
+                    break
+                continue
+            if inst is not None:
+                inst.step(i)
+
             self.update_belief()
             self.bay_updates()
 
@@ -88,20 +142,212 @@ class Agent:
 
         self.mab.quit()
 
+        if inst is not None:
+            inst.end_trial(
+                self.mab,
+                "breakthrough" if self.mab.payoff != 0 else "threshold",
+            )
+
+    def _timed_step(self, inst, i):
+        """
+        Single step of first_strategy, recording the time spent in the
+        belief updates and in the timestep.
+        Returns: 1 if a breakthrough occurs, 0 otherwise.
+        """
+        inst.step(i)
+
+        start = perf_counter()
+        self.update_belief()
+        self.bay_updates()
+        middle = perf_counter()
+        hit = self.mab.timestep()
+        end = perf_counter()
+
+        inst.counters["belief_time"] += middle - start
+        inst.counters["timestep_time"] += end - middle
+
+        return hit
+
+    def adaptive_strategy(self, tol=1e-3, dt_min=1e-4, dt_max=1.0):
+        """
+        Optimal strategy as in first_strategy, with a time step that adapts
+        to the belief. Steps are large while the chosen arm and the belief
+        are stable and shrink when the belief approaches a point where the
+        optimal arm changes or the agent quits, such that these points are
+        passed by at most dt_min. The error of a single adaptation step
+        (Equation 2.12) with respect to the Bayesian update (Equation 2.11)
+        is kept below tol. The MAB model is simulated with MAB.interval.
+        """
+        inst = self.instrument
+        if inst is not None:
+            inst.start_trial(self.p0, "adaptive")
+
+        threshold = self.mab.threshold()
+        while self.p > threshold:
+            i = self.mab.best_arm(self.p)
+            self.mab.select_arm(i)
+            dt = self.adaptive_dt(i, tol, dt_min, dt_max)
+
+            if inst is not None:
+                inst.step(i)
+
+            self.update_belief(dt)
+            self.bay_updates(dt)
+
+            if self.mab.interval(dt):
+                break
+
+        self.mab.quit()
+
+        if inst is not None:
+            inst.end_trial(
+                self.mab,
+                "breakthrough" if self.mab.payoff != 0 else "threshold",
+            )
+
+    def adaptive_dt(self, i, tol=1e-3, dt_min=1e-4, dt_max=1.0):
+        """
+        Size of the next step of adaptive_strategy when arm i is pulled.
+        In log-odds the Bayesian belief decreases linearly, by lambda per
+        unit of time, and the exact dynamics keep the difference between
+        the adapted and the Bayesian belief constant. The adapted belief
+        therefore stays within tol of the Bayesian belief if the log-odds
+        errors of all steps add up to at most 4 tol. The remaining error
+        budget is spread evenly over the log-odds distance to the quit
+        threshold, and the step is halved until the error of the step,
+        continuing from the recorded adaptations, is within its share.
+        The step also ends just past the next breakpoint of the envelope
+        or the quit threshold.
+        Returns: the step size.
+        """
+        p = self.p
+        q = self.upd_history.last
+        rate = self.mab.arm_rate[i]
+        dt = dt_max
+
+        _, breaks, _, threshold = self.mab.envelope()
+        k = bisect_left(breaks, p)
+        bound = threshold
+        if k > 0 and breaks[k - 1] > threshold:
+            bound = breaks[k - 1]
+        if 0 < bound < p:
+            logit = np.log(p / (1 - p)) - np.log(bound / (1 - bound))
+            dt = min(dt, logit / rate + dt_min)
+
+        x = np.log(p / (1 - p))
+        x0 = np.log(self.p0 / (1 - self.p0))
+        if 0 < threshold < self.p0:
+            distance = x0 - np.log(threshold / (1 - threshold))
+        else:
+            distance = np.inf
+
+        while dt > dt_min:
+            step = rate * dt
+            q_next = q - q * (1 - q) * step
+            if 0 < q_next < 1:
+                error = np.log(q_next / (1 - q_next)) - (x - step)
+                share = min((x0 - x + step) / distance, 1)
+                if abs(error) <= 4 * tol * share:
+                    break
+            dt /= 2
+
+        return max(dt, dt_min)
+
+    def arm_strategy(self):
+        """
+        Optimal strategy for the model in which the possibility of success
+        is arm dependent (b_ind). The agent keeps a belief per arm, only
+        the belief of the pulled arm is updated. As in first_strategy,
+        choose the arm with maximal expected gain among all arms whose
+        belief is above the quit threshold, quit once there is no such
+        arm. With equal beliefs this is the choice of first_strategy.
+        """
+        inst = self.instrument
+        if inst is not None:
+            inst.start_trial(self.p0, "arm")
+
+        index = self.arm_index
+        if (
+            index is None
+            or index.p0 != self.p0
+            or index.envelope is not self.mab.envelope()
+        ):
+            index = self.arm_index = ArmIndex(self.mab, self.p0)
+        index.reset()
+
+        while True:
+            i = index.best()
+            if i < 0:
+                break
+
+            self.mab.select_arm(i)
+            if inst is not None:
+                inst.step(i)
+
+            index.update(i, self.mab.arm_rate[i] * self.mab.dt)
+            self.p = index.belief(i)
+
+            if self.mab.timestep():
+                break
+
+        self.mab.quit()
+
+        if inst is not None:
+            inst.end_trial(
+                self.mab,
+                "breakthrough" if self.mab.payoff != 0 else "threshold",
+            )
+
+    def compiled_strategy(self):
+        """
+        Optimal strategy equivalent to first_strategy, where the arm
+        schedule for the initial belief is compiled once and cached.
+        Only the step at which the trial stops is simulated, the belief
+        history is not recorded.
+        """
+        inst = self.instrument
+        if inst is not None:
+            inst.start_trial(self.p0, "compiled")
+
+        table = schedule.cache.get(self.mab, self.p0)
+        steps = table.sample(self.mab)
+        self.p = table.p_bay[steps]
+
+        self.mab.quit()
+
+        if inst is not None:
+            inst.add_steps(table.arms[:steps])
+            inst.end_trial(
+                self.mab,
+                "breakthrough" if self.mab.payoff != 0 else "threshold",
+            )
+
     def baseline_strategy(self, random=True):
         """
         Baseline strategy where arms are chosen randomly. After each time
         step, there is a 20% probability of quitting. Alternatively, a minimal
         costs baseline strategy with 1% quitting probability can be used.
         """
-        while np.random.uniform() > 0.2 * random + (0.01) * (not random):
+        inst = self.instrument
+        if inst is not None:
+            inst.start_trial(self.p0, "random" if random else "min_cost")
+
+        while self.random.uniform() > 0.2 * random + (0.01) * (not random):
             if random:
-                i = np.random.randint(self.mab.N)
+                i = self.random.integers(self.mab.N)
             else:
                 i = np.argmin(self.mab.arm_cost)
 
             self.mab.select_arm(i)
+            if inst is not None:
+                inst.step(i)
 
             if self.mab.timestep() == 1:
                 break
         self.mab.quit()
+
+        if inst is not None:
+            inst.end_trial(
+                self.mab,
+                "breakthrough" if self.mab.payoff != 0 else "random",
+            )
@@ -0,0 +1,116 @@
+"""
+Author: Mara van der Meulen
+---
+This file contains an index over the arms for the model in which the
+possibility of success is arm dependent (b_ind). The agent then keeps a
+belief per arm in log-odds, and only the belief of the pulled arm
+changes. The arm with maximal expected gain is found with a heap of the
+pulled arms and a list of the other arms sorted by their initial gain.
+"""
+import heapq
+import math
+
+import numpy as np
+
+from continuous import logit
+
+
+class ArmIndex:
+    def __init__(self, mab, p0):
+        """
+        Index for initial belief p0 in every arm. As in
+        Agent.first_strategy all arms are candidates, and an arm leaves the
+        index once its belief falls to the quit threshold, the belief
+        below which all arms have a negative expected gain.
+        """
+        self.p0 = p0
+
+        # The cached envelope identifies the arm parameters of the index
+        self.envelope = mab.envelope()
+
+        self.rate = mab.arm_rate.tolist()
+        self.ratio = (mab.arm_cost / mab.arm_rate).tolist()
+
+        # Quit threshold in log-odds
+        threshold = mab.threshold()
+        if threshold <= 0:
+            self.floor = -np.inf
+        elif threshold >= 1:
+            self.floor = np.inf
+        else:
+            self.floor = float(logit(threshold))
+
+        with np.errstate(divide="ignore"):
+            self.x0 = float(logit(np.clip(p0, 0, 1)))
+
+        # Untouched arms ordered by gain (pi_i p - c_i / lambda_i), ties
+        # broken towards the lowest index
+        gain = mab.arm_rate * p0 - mab.arm_cost / mab.arm_rate
+        if self.x0 > self.floor:
+            order = np.argsort(-gain, kind="stable")
+        else:
+            order = np.array([], dtype=int)
+        self.order = order.tolist()
+        self.gain0 = gain[order].tolist()
+
+        self.reset()
+
+    def reset(self):
+        """
+        Reset the beliefs of all arms to the initial belief.
+        """
+        self.x = {}
+        self.heap = []
+        self.next = 0
+
+    def belief(self, i):
+        """
+        Current belief that success is possible on arm i.
+        """
+        x = self.x.get(i, self.x0)
+
+        return 1 / (1 + math.exp(-x)) if x > -700 else 0.0
+
+    def best(self):
+        """
+        Arm with maximal expected gain among the arms whose belief is
+        above the quit threshold, or -1 if there is none.
+        """
+        if self.next < len(self.order):
+            arm = self.order[self.next]
+            if not self.heap:
+                return arm
+
+            gain, other = self.heap[0]
+            if -gain > self.gain0[self.next] or (
+                -gain == self.gain0[self.next] and other < arm
+            ):
+                return other
+            return arm
+
+        return self.heap[0][1] if self.heap else -1
+
+    def update(self, i, exponent):
+        """
+        Bayesian update of the belief of arm i, which must be the arm
+        returned by best, after a time interval in which it is pulled.
+        The exponent is lambda_i times the length of the interval, see
+        Equation 2.11 in Section 2.3.
+        """
+        touched = i in self.x
+        if touched:
+            x = self.x[i] - exponent
+        else:
+            self.next += 1
+            x = self.x0 - exponent
+        self.x[i] = x
+
+        if x > self.floor:
+            p = 1 / (1 + math.exp(-x))
+            item = (self.ratio[i] - self.rate[i] * p, i)
+            if touched:
+                heapq.heapreplace(self.heap, item)
+            else:
+                heapq.heappush(self.heap, item)
+        elif touched:
+            heapq.heappop(self.heap)
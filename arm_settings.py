@@ -5,6 +5,8 @@ This file contains several parameter settings for the Multi-Armed Bandits.
 """
 import numpy as np
 
+from arm_table import ArmTable
+
 
 def setting_a():
     """
@@ -40,3 +42,74 @@ def setting_c(N):
     rate_per_arm = np.ones(N)
 
     return (payoff_per_arm, cost_per_arm, rate_per_arm)
+
+
+def setting(mode, N):
+    """
+    Define parameters for mode "identical" (setting_a), "random"
+    (setting_b) or "specific" (setting_c).
+    """
+    if mode == "identical":
+        return setting_a()
+    elif mode == "random":
+        return setting_b(N)
+    elif mode == "specific":
+        return setting_c(N)
+
+    raise ValueError(f"Unknown arm mode: {mode}")
+
+
+def setting_b_chunks(N, chunk=2**16):
+    """
+    Random arms as in setting_b, generated chunk by chunk. The values
+    differ from setting_b for the same random state, as the parameters
+    are drawn per chunk.
+    Returns: a generator of (payoff, cost, rate) chunks.
+    """
+    for start in range(0, N, chunk):
+        size = min(chunk, N - start)
+        yield (
+            np.random.randint(1, 11, size=size),
+            np.random.randint(1, 11, size=size),
+            np.random.randint(1, 11, size=size),
+        )
+
+
+def setting_c_chunks(N, chunk=2**16):
+    """
+    Specific arms as in setting_c, generated chunk by chunk with the same
+    values.
+    Returns: a generator of (payoff, cost, rate) chunks.
+    """
+    for start in range(0, N, chunk):
+        size = min(chunk, N - start)
+
+        # Same beliefs as np.linspace(0, 1, N + 1) for these arms
+        p = np.arange(start, start + size + 1) * (1.0 / N)
+        if start + size == N:
+            p[-1] = 1.0
+
+        vals = np.power(30, 1.5 * (p - 0.2)) - 1
+        payoff_per_arm = np.maximum(
+            0, (vals[1:] - vals[:-1]) / (p[1:] - p[:-1])
+        )
+        cost_per_arm = np.maximum(0, -(vals[:-1] - p[:-1] * payoff_per_arm))
+        rate_per_arm = np.ones(size)
+
+        yield (payoff_per_arm, cost_per_arm, rate_per_arm)
+
+
+def setting_table(mode, N, path=None, chunk=2**16):
+    """
+    ArmTable for mode "random" or "specific", see setting. The arms are
+    generated chunk by chunk and written to the .npy file path if it is
+    set, see ArmTable.from_chunks.
+    """
+    if mode == "random":
+        chunks = setting_b_chunks(N, chunk)
+    elif mode == "specific":
+        chunks = setting_c_chunks(N, chunk)
+    else:
+        raise ValueError(f"Unknown arm mode for a table: {mode}")
+
+    return ArmTable.from_chunks(chunks, N, path=path)
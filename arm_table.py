@@ -0,0 +1,133 @@
+"""
+Author: Mara van der Meulen
+---
+This file contains a compact table of arm parameters for very large sets
+of arms. The parameters are stored as contiguous float arrays, derived
+columns are computed once, and tables can be saved to and memory-mapped
+from a single .npy file.
+"""
+import numpy as np
+
+from envelope import arm_envelope
+
+
+class ArmTable:
+    def __init__(self, payoff, cost, rate):
+        """
+        Table of arms with the given payoffs, costs and rates. Contiguous
+        float64 arrays, including memory-mapped ones, are not copied.
+        """
+        self.payoff = np.ascontiguousarray(payoff, dtype=float)
+        self.cost = np.ascontiguousarray(cost, dtype=float)
+        self.rate = np.ascontiguousarray(rate, dtype=float)
+
+        if not len(self.payoff) == len(self.cost) == len(self.rate):
+            raise ValueError("Arm parameter arrays differ in length")
+
+        self._ratio = None
+        self._envelope = None
+        # File the table is memory-mapped from, see load
+        self.path = None
+
+    def __reduce__(self):
+        """
+        A memory-mapped table is pickled as its path, so that worker
+        processes map the same file instead of receiving a copy.
+        """
+        if self.path is None:
+            return super().__reduce__()
+
+        return type(self).load, (self.path,)
+
+    def __len__(self):
+        return len(self.payoff)
+
+    def columns(self):
+        """
+        Returns: the payoff, cost and rate arrays.
+        """
+        return self.payoff, self.cost, self.rate
+
+    @property
+    def ratio(self):
+        """
+        Costs per unit of rate c_i / lambda_i, computed once.
+        """
+        if self._ratio is None:
+            self._ratio = self.cost / self.rate
+
+        return self._ratio
+
+    def envelope(self):
+        """
+        Upper envelope and quit threshold of the arms, computed once, see
+        MAB.envelope.
+        """
+        if self._envelope is None:
+            self._envelope = arm_envelope(self.payoff, self.cost, self.rate)
+            self._ratio = self._envelope[2]
+
+        return self._envelope
+
+    @property
+    def threshold(self):
+        """
+        Belief below which all arms have a negative expected gain.
+        """
+        return self.envelope()[3]
+
+    def save(self, path):
+        """
+        Save the table to a .npy file with one row per parameter.
+        """
+        out = np.lib.format.open_memmap(
+            path, mode="w+", dtype=float, shape=(3, len(self))
+        )
+        out[0], out[1], out[2] = self.columns()
+        out.flush()
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Load a table saved with save, memory-mapped read-only if mmap is
+        set so that the arms are only read from disk when used.
+        """
+        data = np.load(path, mmap_mode="r" if mmap else None)
+        table = cls(data[0], data[1], data[2])
+        if mmap:
+            table.path = path
+
+        return table
+
+    @classmethod
+    def from_chunks(cls, chunks, N, path=None):
+        """
+        Build a table of N arms from an iterable of (payoff, cost, rate)
+        chunks, such as the generators in arm_settings. If path is set,
+        the arms are written to a .npy file and the table is memory-mapped
+        from it, so that at most one chunk is held in memory.
+        """
+        if path is None:
+            data = np.empty((3, N))
+        else:
+            data = np.lib.format.open_memmap(
+                path, mode="w+", dtype=float, shape=(3, N)
+            )
+
+        start = 0
+        for payoff, cost, rate in chunks:
+            end = start + len(payoff)
+            data[0, start:end] = payoff
+            data[1, start:end] = cost
+            data[2, start:end] = rate
+            start = end
+
+        if start != N:
+            raise ValueError(f"Chunks contain {start} arms instead of {N}")
+
+        if path is not None:
+            data.flush()
+            del data
+            return cls.load(path)
+
+        return cls(data[0], data[1], data[2])
@@ -6,35 +6,27 @@ with the optimal strategy, once with a random decision baseline
 strategy and once with a minimal costs baseline strategy.
 """
 import numpy as np
-import matplotlib.pyplot as plt
 
-from agent import Agent
 from mab import MAB
+from result_store import ResultStore
+from sweep import paired_curves, sweep_stats
 import arm_settings as arm
+import plotting
 
-# Set random seed for reproducibility
-np.random.seed(56)
+P_VALS = np.linspace(0, 1, 41)[:-1]
 
-trials = 20000
-p_vals = np.linspace(0, 1, 41)[:-1]
-N = 20
-
-# Choose mode "identical", "random", "specific"
-arm_mode = "identical"
-if arm_mode == "identical":
-    payoff_per_arm, cost_per_arm, rate_per_arm = arm.setting_a()
-elif arm_mode == "random":
-    payoff_per_arm, cost_per_arm, rate_per_arm = arm.setting_b(N)
-else:
-    payoff_per_arm, cost_per_arm, rate_per_arm = arm.setting_c(N)
+STRATEGIES = (
+    ("optimal strategy", 0),
+    ("baseline strategy (random)", 1),
+    ("baseline strategy (min costs)", 2),
+)
 
 
-def plot_values(N, payoff_per_arm, cost_per_arm, rate_per_arm, label, base=0):
+def model(N, payoff_per_arm, cost_per_arm, rate_per_arm):
     """
-    Plot the average eventual value with 95% confidence interval, the base
-    parameter is used to indicate which strategy should be use.
+    MAB model shared by all strategies.
     """
-    mab = MAB(
+    return MAB(
         N,
         payoff_per_arm,
         cost_per_arm,
@@ -43,76 +35,124 @@ def plot_values(N, payoff_per_arm, cost_per_arm, rate_per_arm, label, base=0):
         b_ind=False,
     )
 
-    agent = Agent(mab, 0.5)
-
-    data = []
-    for p in p_vals:
-        agent.p0 = p
-        agent.mab.priori = p
-        agent.reset()
-
-        vals = []
-        success = 0
-        for _ in range(trials):
-            if base == 1:
-                agent.baseline_strategy()
-            elif base == 2:
-                agent.baseline_strategy(random=False)
-            else:
-                agent.first_strategy()
-            vals.append(agent.mab.value)
-
-            if agent.mab.payoff != 0:
-                success += 1
-
-            agent.reset()
-        data.append(vals)
-        print(f"Successes: {success}/{trials}")
-
-    avg_value = np.mean(data, axis=1)
-    std_value = np.std(data, axis=1)
-    plt.errorbar(
-        p_vals,
-        avg_value,
-        yerr=2 * std_value / np.sqrt(trials),
-        fmt=".",
-        label=label,
-    )
 
-
-# Plot the results for all three strategies
-_ = plt.figure(figsize=(8, 5))
-plot_values(
+def run_values(
     N,
     payoff_per_arm,
     cost_per_arm,
     rate_per_arm,
-    "optimal strategy",
     base=0,
-)
-plot_values(
-    N,
-    payoff_per_arm,
-    cost_per_arm,
-    rate_per_arm,
-    "baseline strategy (random)",
-    base=1,
-)
-plot_values(
-    N,
-    payoff_per_arm,
-    cost_per_arm,
-    rate_per_arm,
-    "baseline strategy (min costs)",
-    base=2,
-)
+    trials=20000,
+    p_vals=P_VALS,
+    engine="scalar",
+    workers=None,
+    target=None,
+    progress=None,
+    cache_dir=None,
+    seed=56,
+    log=True,
+):
+    """
+    Compute the average eventual value with 95% confidence interval, the
+    base parameter is used to indicate which strategy should be use.
+    Returns: a RunningStats object for every initial belief.
+    """
+    mab = model(N, payoff_per_arm, cost_per_arm, rate_per_arm)
 
-plt.xticks(p_vals[::4])
+    return sweep_stats(
+        mab,
+        p_vals,
+        trials,
+        base=base,
+        priori=True,
+        engine=engine,
+        workers=workers,
+        seed=seed,
+        target=target,
+        progress=progress,
+        store=ResultStore(cache_dir) if cache_dir else None,
+        log=log,
+    )
 
-plt.title(
-    "Agent's strategy based on Theorem 1 in Multi-Armed Exponential Bandit [Chen et al]"
-)
-plt.xlabel("initial belief $p$")
-plt.ylabel("value")
-plt.legend()
-plt.show()
+
+def run(
+    arm_mode="identical",
+    N=20,
+    trials=20000,
+    p_vals=P_VALS,
+    engine="scalar",
+    workers=None,
+    target=None,
+    progress=None,
+    cache_dir=None,
+    seed=56,
+    log=True,
+    common=False,
+):
+    """
+    Run the experiment for all three strategies, see first_strategy.run
+    for the options. If common is set, all strategies use common random
+    numbers and the paired differences with the optimal strategy are
+    computed as well, see sweep.paired_sweep. The target, cache_dir
+    and progress options are then rejected.
+    Returns: the initial beliefs, a (label, RunningStats objects) pair
+    for every strategy and a list of such pairs for the paired
+    differences, which is empty unless common is set.
+    """
+    # Set random seed for reproducibility
+    np.random.seed(seed)
+
+    payoff_per_arm, cost_per_arm, rate_per_arm = arm.setting(arm_mode, N)
+
+    if common:
+        mab = model(N, payoff_per_arm, cost_per_arm, rate_per_arm)
+        variants = [(mab, base, True) for _, base in STRATEGIES]
+        labels = [label for label, _ in STRATEGIES]
+        curves, differences = paired_curves(
+            labels,
+            variants,
+            p_vals,
+            trials,
+            engine=engine,
+            workers=workers,
+            seed=seed,
+            log=log,
+            target=target,
+            progress=progress,
+            cache_dir=cache_dir,
+        )
+
+        return p_vals, curves, differences
+
+    curves = []
+    for label, base in STRATEGIES:
+        stats = run_values(
+            N,
+            payoff_per_arm,
+            cost_per_arm,
+            rate_per_arm,
+            base=base,
+            trials=trials,
+            p_vals=p_vals,
+            engine=engine,
+            workers=workers,
+            target=target,
+            progress=progress,
+            cache_dir=cache_dir,
+            seed=seed,
+            log=log,
+        )
+        curves.append((label, stats))
+
+    return p_vals, curves, []
+
+
+def plot(result, out=None):
+    """
+    Plot the results of run, the figure is saved to out if it is set.
+    """
+    plotting.plot_curves(result, out)
+
+
+if __name__ == "__main__":
+    plot(run())
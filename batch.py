@@ -0,0 +1,238 @@
+"""
+Author: Mara van der Meulen
+---
+This file contains batched counterparts of the MAB and Agent classes
+that simulate many independent trials at once using NumPy arrays.
+"""
+import numpy as np
+
+
+class BatchMAB:
+    def __init__(self, mab, trials, priori=None):
+        """
+        Batch of trials of the scalar model mab. The a priori probability
+        can be given per trial, by default that of mab is used.
+        """
+        self.mab = mab
+        self.trials = trials
+        self._priori = priori
+
+        # Arm parameters are shared with the scalar model
+        self.N = mab.N
+        self.arm_payoff = mab.arm_payoff
+        self.arm_cost = mab.arm_cost
+        self.arm_rate = mab.arm_rate
+
+        self.dt = mab.dt
+        self.priori = mab.priori
+        self.b_ind = mab.b_ind
+        self.random = mab.random
+
+        self.reset()
+
+    def reset(self):
+        """
+        Resets all trials of the batched multi-armed bandit game.
+        """
+        self.priori = self.mab.priori if self._priori is None else self._priori
+        self.dt = self.mab.dt
+
+        if self.b_ind:
+            priori = self.priori
+            if np.ndim(priori) > 0:
+                priori = priori[:, None]
+            self.arm_success = (
+                self.random.binomial(1, priori, (self.trials, self.N)) == 1
+            )
+        else:
+            self.arm_success = (
+                self.random.binomial(1, self.priori, self.trials) == 1
+            )
+
+        self.costs = np.zeros(self.trials)
+        self.payoff = np.zeros(self.trials)
+        self.value = np.zeros(self.trials)
+
+    def timestep(self, idx, arms):
+        """
+        Simulate a single timestep for the trials in idx, where trial
+        idx[k] pulls arm arms[k]. Returns a boolean array marking the
+        trials in which a breakthrough occurs.
+        """
+        time = self.random.exponential(1 / self.arm_rate[arms], len(arms))
+
+        # Determine costs
+        self.costs[idx] += self.arm_cost[arms] * np.minimum(time, self.dt)
+
+        # Probability of breakthrough explained in Section 3.2
+        if self.b_ind:
+            possible = self.arm_success[idx, arms]
+        else:
+            possible = self.arm_success[idx]
+
+        hit = possible & (time < self.dt)
+        self.payoff[idx[hit]] += self.arm_payoff[arms[hit]]
+
+        return hit
+
+    def quit(self):
+        """
+        All trials quit, compute the eventual value of every trial.
+        """
+        self.value = self.payoff - self.costs
+
+
+class BatchAgent:
+    def __init__(self, mab, p):
+        """
+        Agents for a batch of trials with initial belief p, which can be
+        given per trial.
+        """
+        self.mab = mab
+        self.p0 = np.broadcast_to(np.asarray(p, dtype=float), mab.trials)
+
+        self.reset()
+
+    def reset(self):
+        """
+        Resets the belief of every trial to the initial belief, and
+        resets the corresponding batched MAB model.
+        """
+        self.p = self.p0.copy()
+        self.p_upd = self.p.copy()
+        self.exponent = np.zeros(self.mab.trials)
+
+        self.mab.reset()
+
+    def first_strategy(self):
+        """
+        Batched version of Agent.first_strategy. Every trial follows the
+        optimal strategy independently, trials are retired as soon as
+        a breakthrough occurs or the belief crosses the quit threshold.
+        """
+        mab = self.mab
+        threshold = mab.mab.threshold()
+        alive = np.ones(mab.trials, dtype=bool)
+
+        while True:
+            alive &= self.p > threshold
+            idx = np.flatnonzero(alive)
+            if len(idx) == 0:
+                break
+
+            # Choose project i that maximizes (pi_i p - c_i / lambda_i)
+            arms = mab.mab.best_arms(self.p[idx])
+            rate = mab.arm_rate[arms]
+
+            # Equation 2.12 and Equation 2.11 in Section 2.3
+            prev = self.p_upd[idx]
+            self.p_upd[idx] = prev - prev * (1 - prev) * rate * mab.dt
+            self.exponent[idx] += rate * mab.dt
+            p0 = self.p0[idx]
+            prob = p0 * np.exp(-self.exponent[idx])
+            self.p[idx] = prob / (prob + (1 - p0))
+
+            alive[idx[mab.timestep(idx, arms)]] = False
+
+        mab.quit()
+
+    def baseline_strategy(self, random=True):
+        """
+        Batched version of Agent.baseline_strategy. Instead of looping
+        over time steps, the number of steps before quitting is drawn as
+        a geometric variable for every trial. Every step of the random
+        baseline is then simulated at once in a flattened array, the
+        minimal costs baseline skips ahead to the first step in which the
+        exponential time is shorter than dt.
+        """
+        mab = self.mab
+        prob = 0.2 if random else 0.01
+
+        # Number of steps taken before quitting, see Agent.baseline_strategy
+        steps = mab.random.geometric(prob, mab.trials) - 1
+
+        if random:
+            self._random_baseline(steps)
+        else:
+            self._min_cost_baseline(steps)
+
+        mab.quit()
+
+    def _random_baseline(self, steps):
+        """
+        Simulate all steps of the random baseline strategy at once and
+        only keep the steps up to the first breakthrough of every trial.
+        """
+        mab = self.mab
+        total = np.sum(steps)
+        owner = np.repeat(np.arange(mab.trials), steps)
+
+        arms = mab.random.integers(mab.N, total)
+        time = mab.random.exponential(1 / mab.arm_rate[arms], total)
+
+        if mab.b_ind:
+            possible = mab.arm_success[owner, arms]
+        else:
+            possible = mab.arm_success[owner]
+
+        # First step with a breakthrough of every trial
+        hit = np.flatnonzero(possible & (time < mab.dt))
+        broke, first = np.unique(owner[hit], return_index=True)
+        last = np.repeat(np.cumsum(steps), steps)
+        last[np.isin(owner, broke)] = np.repeat(hit[first] + 1, steps[broke])
+
+        keep = np.arange(total) < last
+        mab.costs += np.bincount(
+            owner[keep],
+            weights=(mab.arm_cost[arms] * np.minimum(time, mab.dt))[keep],
+            minlength=mab.trials,
+        )
+        mab.payoff[broke] += mab.arm_payoff[arms[hit[first]]]
+
+    def _min_cost_baseline(self, steps):
+        """
+        Simulate the minimal costs baseline strategy, which always pulls
+        the same arm. A step is short if its exponential time is below dt,
+        the first short step is geometrically distributed.
+        """
+        mab = self.mab
+        arm = np.argmin(mab.arm_cost)
+        rate = mab.arm_rate[arm]
+        cost = mab.arm_cost[arm]
+        short = -np.expm1(-rate * mab.dt)
+
+        if mab.b_ind:
+            possible = mab.arm_success[:, arm]
+        else:
+            possible = mab.arm_success
+
+        # Breakthrough in the first short step if success is possible
+        first = mab.random.geometric(short, mab.trials)
+        broke = possible & (first <= steps)
+        time = self._truncated_exponential(rate, short, mab.trials)
+
+        costs = cost * steps * mab.dt
+        costs[broke] = cost * ((first[broke] - 1) * mab.dt + time[broke])
+
+        # Without a possible breakthrough, short steps cost their time
+        idx = np.flatnonzero(~possible)
+        count = mab.random.binomial(steps[idx], short)
+        time = self._truncated_exponential(rate, short, np.sum(count))
+        spent = np.bincount(
+            np.repeat(np.arange(len(idx)), count),
+            weights=time,
+            minlength=len(idx),
+        )
+        costs[idx] = cost * ((steps[idx] - count) * mab.dt + spent)
+
+        mab.costs += costs
+        mab.payoff[broke] += mab.arm_payoff[arm]
+
+    def _truncated_exponential(self, rate, short, size):
+        """
+        Exponential times with the given rate conditioned to be below dt,
+        where short is the probability of that event.
+        """
+        unif = self.mab.random.uniform(size)
+
+        return -np.log1p(-unif * short) / rate
@@ -6,90 +6,147 @@ this belief represents the probability of a breakthrough occuring in
 the future given that none has occured yet.
 """
 import numpy as np
-import matplotlib.pyplot as plt
 
 from agent import Agent
 from mab import MAB
+from trajectory_store import TrajectoryStore
 import arm_settings as arm
+import continuous
+import plotting
+import trajectory
+
+DT_VALS = (0.2, 0.1, 0.05, 0.01)
+
+
+def compute_beliefs(
+    dt_vals,
+    N,
+    payoff_per_arm,
+    cost_per_arm,
+    rate_per_arm,
+    p0=0.95,
+    trials=200,
+    tol=None,
+):
+    """
+    Compute the belief using two methods for several time step sizes
+    and the specified model parameters, together with the exact belief
+    in continuous time. The beliefs are deterministic until a
+    breakthrough, so they are computed for all time step sizes at once
+    without simulating trials. If tol is set, adaptive time steps of at
+    most dt are simulated instead, see Agent.adaptive_strategy.
+    Returns: for every time step size the times of the steps, the
+    beliefs using Bayesian updates and adaptations per time step, and
+    the times and beliefs in continuous time.
+    """
+    mab = MAB(N, payoff_per_arm, cost_per_arm, rate_per_arm, b_ind=False)
 
-trials = 200
-p0 = 0.95
+    # Exact belief in continuous time, independent of dt
+    arms, durations = continuous.schedule(mab, p0)
+    t = np.linspace(0, np.sum(durations), 500)
+    p_exact = continuous.belief_path(p0, mab, arms, durations, t)
 
-# MAB settings
-N = 20
+    if tol is None:
+        lengths, times, p_bay, p_upd = trajectory.beliefs(
+            mab, p0, dt_vals, arms, durations
+        )
+        return [
+            (times[i, :n], p_bay[i, :n], p_upd[i, :n], t, p_exact)
+            for i, n in enumerate(lengths)
+        ]
 
-# Choose mode "identical", "random", "specific"
-arm_mode = "specific"
-if arm_mode == "identical":
-    payoff_per_arm, cost_per_arm, rate_per_arm = arm.setting_a()
-elif arm_mode == "random":
-    payoff_per_arm, cost_per_arm, rate_per_arm = arm.setting_b(N)
-else:
-    payoff_per_arm, cost_per_arm, rate_per_arm = arm.setting_c(N)
+    agent = Agent(mab, p0)
+    result = []
+    for dt in dt_vals:
+        times, p_bay, p_upd = (TrajectoryStore() for _ in range(3))
+        for _ in range(trials):
+            agent.adaptive_strategy(tol=tol, dt_max=dt)
+            times.append(agent.times)
+            p_bay.append(agent.p_bay)
+            p_upd.append(agent.p_upd)
+            agent.reset()
+
+        # Take the maximal value over all runs (deterministic except for
+        # b=0 or 1), the runs only differ in length
+        result.append(
+            (
+                times.pointwise("max"),
+                p_bay.pointwise("max"),
+                p_upd.pointwise("max"),
+                t,
+                p_exact,
+            )
+        )
+
+    return result
+
+
+def run(
+    arm_mode="specific", N=20, p0=0.95, trials=200, dt_vals=DT_VALS, tol=None
+):
+    """
+    Compute the beliefs for several time step sizes, which are maximal
+    step sizes if the tolerance tol of adaptive time steps is set.
+    Returns: a (dt, tol, beliefs) tuple for every time step size, see
+    compute_belief for the beliefs.
+    """
+    payoff_per_arm, cost_per_arm, rate_per_arm = arm.setting(arm_mode, N)
+
+    beliefs = compute_beliefs(
+        dt_vals,
+        N,
+        payoff_per_arm,
+        cost_per_arm,
+        rate_per_arm,
+        p0=p0,
+        trials=trials,
+        tol=tol,
+    )
 
+    return [(dt, tol, b) for dt, b in zip(dt_vals, beliefs)]
 
-def plot_belief(dt, payoff_per_arm, cost_per_arm, rate_per_arm):
+
+def plot_belief(plt, title, times, p_bay, p_upd, t, p_exact):
     """
     Plot a comparison between two methods to calculate belief for
-    a specified time step size and model parameters.
+    a specified time step size.
     """
-    mab = MAB(N, payoff_per_arm, cost_per_arm, rate_per_arm, b_ind=False)
-    agent = Agent(mab, p0)
-
-    # Set time step
-    agent.mab.dt = dt
-
-    # Compute belief using bayesian updates and adaptations
-    p_bay = []
-    p_upd = []
-    for _ in range(trials):
-        agent.first_strategy()
-        p_bay.append(agent.p_bay)
-        p_upd.append(agent.p_upd)
-        agent.reset()
-
-    # PLOT the maximal value over all runs (deterministic except for b=0 or 1)
-    length = np.max([len(p) for p in p_bay])
-    p_bay = np.array([np.pad(r, (0, length - len(r))) for r in p_bay])
-    p_upd = np.array([np.pad(r, (0, length - len(r))) for r in p_upd])
-
-    plt.plot(
-        np.arange(np.shape(p_bay)[1]) * agent.mab.dt,
-        np.max(p_bay, axis=0),
-        label="Bayesian updates",
-    )
-    plt.plot(
-        np.arange(np.shape(p_upd)[1]) * agent.mab.dt,
-        np.max(p_upd, axis=0),
-        label="adaptations",
-    )
+    plt.plot(times, p_bay, label="Bayesian updates")
+    plt.plot(times, p_upd, label="adaptations")
+    plt.plot(t, p_exact, "--", color="black", label="continuous time")
 
     plt.xlim(0, 4.3)
     plt.ylim(0, 1)
 
-    plt.title(f"$dt$ = {dt}")
+    plt.title(title)
     plt.xlabel("time $t$")
     plt.ylabel("belief $p$")
     plt.legend()
 
 
-def belief_figure(payoff_per_arm, cost_per_arm, rate_per_arm):
+def plot(result, out=None):
     """
-    Plot a comparison of the computed beliefs for several time step sizes.
+    Plot a comparison of the computed beliefs for several time step sizes,
+    the figure is saved to out if it is set.
     """
-    _ = plt.subplots(4, figsize=(10, 7))
+    plt = plotting.pyplot(headless=out is not None)
 
-    vals = [0.2, 0.1, 0.05, 0.01]
+    _ = plt.subplots(len(result), figsize=(10, 7))
 
-    for i in range(4):
-        plt.subplot(2, 2, i + 1)
-        plot_belief(vals[i], payoff_per_arm, cost_per_arm, rate_per_arm)
+    for i, (dt, tol, beliefs) in enumerate(result):
+        plt.subplot(2, (len(result) + 1) // 2, i + 1)
+        if tol is None:
+            title = f"$dt$ = {dt}"
+        else:
+            title = f"$dt \\leq$ {dt}, tol = {tol}"
+        plot_belief(plt, title, *beliefs)
 
     plt.suptitle(
         "Comparison of different methods to calculate the agent's belief over time."
     )
     plt.tight_layout()
-    plt.show()
+    plotting.finish(plt, out)
 
 
-belief_figure(payoff_per_arm, cost_per_arm, rate_per_arm)
+if __name__ == "__main__":
+    plot(run())
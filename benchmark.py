@@ -0,0 +1,241 @@
+"""
+Author: Mara van der Meulen
+---
+Benchmarks for the simulation hot paths. Results are saved as JSON so
+that two versions of the code can be compared, for example
+
+    python benchmark.py run --out before.json
+    python benchmark.py run --out after.json
+    python benchmark.py compare before.json after.json --threshold 0.1
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from agent import Agent
+from mab import MAB
+from sweep import sweep_stats
+import arm_settings as arm
+import belief
+
+
+def timed(func, repeat=3):
+    """
+    Best wall time of func over several repetitions.
+    Returns: the time in seconds and the result of the last call.
+    """
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+
+    return best, result
+
+
+def bench_steps(N=20, dt=0.001):
+    """
+    Timesteps per second of a single trial of the optimal strategy,
+    without breakthroughs so that every trial has the same length.
+    """
+    mab = MAB(N, *arm.setting_c(N), priori=0)
+    mab.dt = dt
+    agent = Agent(mab, 0.95, history="none")
+
+    def trial():
+        agent.reset()
+        agent.first_strategy()
+        return agent.bay_history.size - 1
+
+    seconds, steps = timed(trial)
+
+    return steps / seconds
+
+
+def bench_trials(base, N=20, trials=2000):
+    """
+    Trials per second of a strategy (0: optimal, 1: random baseline,
+    2: minimal costs baseline) at initial belief 0.5.
+    """
+    mab = MAB(N, *arm.setting_c(N))
+    agent = Agent(mab, 0.5, history="none")
+
+    def run():
+        for _ in range(trials):
+            if base == 1:
+                agent.baseline_strategy()
+            elif base == 2:
+                agent.baseline_strategy(random=False)
+            else:
+                agent.first_strategy()
+            agent.reset()
+
+    seconds, _ = timed(run)
+
+    return trials / seconds
+
+
+def bench_sweep(N, trials=200, points=8, engine="batch"):
+    """
+    Wall time and peak traced memory of a sweep over initial beliefs.
+    """
+    np.random.seed(56)
+    mab = MAB(N, *arm.setting_b(N))
+    p_vals = np.linspace(0, 1, points + 1)[:-1]
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    sweep_stats(mab, p_vals, trials, engine=engine)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return seconds, peak
+
+
+def bench_belief(dt_vals=(0.2, 0.1, 0.05, 0.01, 0.001)):
+    """
+    Belief trajectory steps per second as computed in belief.py, from
+    the closed form trajectories of trajectory.beliefs.
+    """
+    args = arm.setting_c(20)
+    seconds, beliefs = timed(
+        lambda: belief.compute_beliefs(dt_vals, 20, *args)
+    )
+
+    return sum(len(p_bay) for _, p_bay, _, _, _ in beliefs) / seconds
+
+
+def run(quick=False, sizes=(20, 1000, 100000)):
+    """
+    Run all benchmarks.
+    Returns: a dictionary with the benchmark results and metadata.
+    """
+    scale = 0.1 if quick else 1
+    results = {}
+
+    def record(name, value, unit, higher_is_better):
+        results[name] = dict(
+            value=float(value), unit=unit, higher_is_better=higher_is_better
+        )
+
+    record("single_trial_steps", bench_steps(), "steps/s", True)
+
+    for base, name in enumerate(("optimal", "random", "min_cost")):
+        trials = max(10, int(2000 * scale))
+        record(
+            f"trials_{name}",
+            bench_trials(base, trials=trials),
+            "trials/s",
+            True,
+        )
+
+    # Time and peak memory of a full sweep, for each sweep engine
+    for engine, prefix in (("batch", "sweep"), ("scalar", "scalar_sweep")):
+        for N in sizes:
+            seconds, peak = bench_sweep(
+                N, trials=max(10, int(200 * scale)), engine=engine
+            )
+            record(f"{prefix}_time_N{N}", seconds, "s", False)
+            record(f"{prefix}_peak_memory_N{N}", peak, "bytes", False)
+
+    # Belief steps per second of the trajectories plotted in belief.py
+    record("belief_trajectory_throughput", bench_belief(), "steps/s", True)
+
+    return dict(meta=metadata(quick), results=results)
+
+
+def metadata(quick):
+    """
+    Description of the environment the benchmarks ran in.
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return dict(
+        commit=commit,
+        quick=quick,
+        python=platform.python_version(),
+        numpy=np.__version__,
+        machine=platform.machine(),
+    )
+
+
+def compare(old, new, threshold=0.1):
+    """
+    Compare two sets of benchmark results. A benchmark regresses if it
+    is more than threshold (relative) worse in the new results.
+    Returns: a list of (name, old value, new value, relative change,
+    regressed) tuples.
+    """
+    rows = []
+    for name, result in new["results"].items():
+        if name not in old["results"]:
+            continue
+
+        before = old["results"][name]["value"]
+        after = result["value"]
+        change = (after - before) / before if before else 0.0
+        if result["higher_is_better"]:
+            regressed = change < -threshold
+        else:
+            regressed = change > threshold
+
+        rows.append((name, before, after, change, regressed))
+
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python benchmark.py")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("--out", help="save the results to this file")
+    run_parser.add_argument("--quick", action="store_true")
+
+    compare_parser = commands.add_parser("compare", help="compare results")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=0.1)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        output = run(quick=args.quick)
+        for name, result in output["results"].items():
+            print(f"{name:28s} {result['value']:14.6g} {result['unit']}")
+
+        if args.out:
+            with open(args.out, "w") as f:
+                json.dump(output, f, indent=2)
+        return 0
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    rows = compare(old, new, args.threshold)
+    for name, before, after, change, regressed in rows:
+        flag = "REGRESSION" if regressed else ""
+        print(f"{name:28s} {before:12.6g} {after:12.6g} {change:+8.1%} {flag}")
+
+    return 1 if any(row[-1] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""
+Author: Mara van der Meulen
+---
+Command line interface to run the experiments, for example
+
+    python cli.py run baseline --arms specific --trials 20000 --out fig.png
+
+Options that do not apply to an experiment are rejected. Without --out
+the figure is shown, with --out it is saved without opening a window.
+"""
+import argparse
+import importlib
+import inspect
+import sys
+
+EXPERIMENTS = (
+    "first_strategy",
+    "baseline",
+    "strategy_info",
+    "misspecification",
+    "belief",
+    "gain",
+    "settingc",
+)
+
+
+def parser():
+    """
+    Argument parser of the command line interface.
+    """
+    parser = argparse.ArgumentParser(prog="python cli.py")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run an experiment")
+    run.add_argument("experiment", choices=EXPERIMENTS)
+    run.add_argument(
+        "--arms",
+        dest="arm_mode",
+        choices=("identical", "random", "specific"),
+    )
+    run.add_argument("--N", "-N", dest="N", type=int)
+    run.add_argument("--trials", type=int)
+    run.add_argument(
+        "--engine",
+        choices=(
+            "scalar",
+            "compiled",
+            "batch",
+            "population",
+            "continuous",
+            "adaptive",
+        ),
+    )
+    run.add_argument("--workers", type=int)
+    run.add_argument("--target", type=float)
+    run.add_argument(
+        "--progress",
+        type=float,
+        metavar="SECONDS",
+        help="log a snapshot of the sweep every SECONDS seconds",
+    )
+    run.add_argument("--cache-dir", dest="cache_dir")
+    run.add_argument("--seed", type=int)
+    run.add_argument("--p0", type=float)
+    run.add_argument(
+        "--tol", type=float, help="adaptive time steps with this tolerance"
+    )
+    run.add_argument("--info", action="store_const", const=True)
+    run.add_argument(
+        "--reference",
+        action="store_const",
+        const=True,
+        help="plot the exact expected value",
+    )
+    run.add_argument(
+        "--common",
+        action="store_const",
+        const=True,
+        help="common random numbers and paired differences",
+    )
+    run.add_argument("--experiment", dest="variant", choices=("info", "b_ind"))
+    run.add_argument("--quiet", dest="log", action="store_const", const=False)
+    run.add_argument("--out", help="save the figure to this file")
+
+    return parser
+
+
+def main(argv=None):
+    args = vars(parser().parse_args(argv))
+    module = importlib.import_module(args.pop("experiment"))
+    args.pop("command")
+    out = args.pop("out")
+
+    # The strategy_info experiment is selected with --experiment
+    if args["variant"] is not None:
+        args["experiment"] = args["variant"]
+    args.pop("variant")
+
+    options = {key: value for key, value in args.items() if value is not None}
+    accepted = inspect.signature(module.run).parameters
+    unknown = sorted(key for key in options if key not in accepted)
+    if unknown:
+        sys.exit(f"Options not supported by {module.__name__}: {unknown}")
+
+    module.plot(module.run(**options), out=out)
+
+
+if __name__ == "__main__":
+    main()
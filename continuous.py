@@ -0,0 +1,117 @@
+"""
+Author: Mara van der Meulen
+---
+This file contains an event-driven simulation of the optimal strategy
+in continuous time. Until a breakthrough occurs the chosen arms and the
+agent's belief are deterministic, so the arm schedule is computed once
+and the breakthrough time is sampled once per trial.
+"""
+import numpy as np
+
+from envelope import envelope_index
+
+
+def logit(p):
+    """
+    Log-odds of the belief p.
+    """
+    return np.log(p) - np.log1p(-p)
+
+
+def schedule(mab, p0):
+    """
+    Compute the arms chosen by the optimal strategy in continuous time
+    for initial belief p0, together with the time spent on each arm
+    before the belief crosses the quit threshold.
+    Returns: the arm indices and the durations of the segments.
+    """
+    # Arm with maximal (pi_i p - c_i / lambda_i), see Agent.first_strategy
+    hull, breaks, _, threshold = mab.envelope()
+    if p0 <= threshold:
+        return np.zeros(0, dtype=int), np.zeros(0)
+
+    arms = []
+    durations = []
+    p = p0
+    k = envelope_index(breaks, p0)
+    while p > threshold:
+        end = breaks[k - 1] if k > 0 else -np.inf
+        end = max(end, threshold)
+
+        # The belief evolves according to Equation 2.11 in Section 2.3
+        rate = mab.arm_rate[hull[k]]
+        arms.append(hull[k])
+        durations.append((logit(p) - logit(end)) / rate)
+
+        p = end
+        k -= 1
+
+    return np.array(arms, dtype=int), np.array(durations)
+
+
+def belief_path(p0, mab, arms, durations, t):
+    """
+    Exact Bayesian belief at the times t while following the schedule.
+    """
+    t = np.asarray(t, dtype=float)
+    rates = mab.arm_rate[arms]
+    if len(arms) == 0:
+        return np.full_like(t, p0)
+
+    # Accumulated rate Lambda(t) is piecewise linear along the schedule
+    ends = np.cumsum(durations)
+    starts = ends - durations
+    hazard = np.concatenate(([0], np.cumsum(rates * durations)))
+
+    k = np.minimum(np.searchsorted(ends, t, side="right"), len(arms) - 1)
+    exponent = hazard[k] + rates[k] * np.clip(t - starts[k], 0, None)
+    exponent = np.minimum(exponent, hazard[-1])
+
+    prob = p0 * np.exp(-exponent)
+    return prob / (prob + (1 - p0))
+
+
+def simulate(mab, p0, trials):
+    """
+    Simulate trials of the optimal strategy in continuous time.
+    Returns: the value and payoff of every trial.
+    """
+    arms, durations = schedule(mab, p0)
+    rates = mab.arm_rate[arms]
+    if len(arms) == 0:
+        return np.zeros(trials), np.zeros(trials)
+
+    if mab.b_ind:
+        success = mab.random.binomial(1, mab.priori, (trials, mab.N)) == 1
+        success = success[:, arms]
+    else:
+        success = mab.random.binomial(1, mab.priori, (trials, 1)) == 1
+
+    # Breakthrough occurs once the accumulated rate of arms on which
+    # success is possible exceeds a standard exponential variable
+    hazard = np.cumsum(success * (rates * durations), axis=1)
+    hazard = np.broadcast_to(hazard, (trials, len(arms)))
+    draw = mab.random.exponential(1, trials)
+
+    hit = hazard > draw[:, None]
+    broke = np.any(hit, axis=1)
+    seg = np.argmax(hit, axis=1)
+
+    costs = np.full(trials, np.sum(mab.arm_cost[arms] * durations))
+    payoff = np.zeros(trials)
+
+    if np.any(broke):
+        idx = np.flatnonzero(broke)
+        seg = seg[idx]
+        before = hazard[idx, seg] - rates[seg] * durations[seg]
+        spent = np.concatenate(
+            ([0], np.cumsum(mab.arm_cost[arms] * durations))
+        )
+
+        costs[idx] = (
+            spent[seg]
+            + mab.arm_cost[arms[seg]] * (draw[idx] - before) / rates[seg]
+        )
+        payoff[idx] = mab.arm_payoff[arms[seg]]
+
+    return payoff - costs, payoff
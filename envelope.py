@@ -0,0 +1,68 @@
+"""
+Author: Mara van der Meulen
+---
+This file contains functions to compute the upper envelope of a set of
+lines, used to determine the arm with maximal expected gain for a
+given belief without evaluating every arm.
+"""
+import numpy as np
+
+
+def upper_envelope(slopes, intercepts):
+    """
+    Compute the upper envelope of the lines slopes * p + intercepts.
+    Returns: the indices of the lines on the envelope ordered by
+    increasing slope, and the beliefs at which consecutive lines on
+    the envelope intersect. For equal lines the lowest index is kept.
+    """
+    slopes = np.asarray(slopes, dtype=float)
+    intercepts = np.asarray(intercepts, dtype=float)
+
+    # Sort by slope, for equal slopes the highest intercept comes first,
+    # only that line of every slope can be on the envelope
+    order = np.lexsort((np.arange(len(slopes)), -intercepts, slopes))
+    _, first = np.unique(slopes[order], return_index=True)
+
+    hull = []
+    for i in order[first]:
+        while len(hull) >= 2 and _cross(
+            slopes, intercepts, hull[-2], i
+        ) <= _cross(slopes, intercepts, hull[-2], hull[-1]):
+            hull.pop()
+        hull.append(i)
+
+    breaks = [
+        _cross(slopes, intercepts, hull[k], hull[k + 1])
+        for k in range(len(hull) - 1)
+    ]
+
+    return np.array(hull, dtype=int), np.array(breaks, dtype=float)
+
+
+def arm_envelope(payoff, cost, rate):
+    """
+    Upper envelope of the lines lambda_i p - c_i / lambda_i maximized by
+    the optimal strategy, together with the quit threshold.
+    Returns: the arm indices on the envelope, the beliefs at which the
+    envelope switches arms (as a list), c_i / lambda_i for all arms and
+    the quit threshold.
+    """
+    ratio = cost / rate
+    hull, breaks = upper_envelope(rate, -ratio)
+    threshold = np.min(cost / (rate * payoff))
+
+    return hull, breaks.tolist(), ratio, threshold
+
+
+def envelope_index(breaks, p):
+    """
+    Position on the envelope of the line with maximal value at belief p.
+    """
+    return np.searchsorted(breaks, p, side="left")
+
+
+def _cross(slopes, intercepts, i, j):
+    """
+    Belief at which lines i and j intersect, where slope j > slope i.
+    """
+    return (intercepts[i] - intercepts[j]) / (slopes[j] - slopes[i])
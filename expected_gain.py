@@ -0,0 +1,88 @@
+"""
+Author: Mara van der Meulen
+---
+This file contains functions to evaluate the maximal expected gain
+max {0, max_i {pi_i p - c_i / lambda_i}} over a grid of beliefs with
+bounded memory usage.
+"""
+import numpy as np
+
+from envelope import upper_envelope, envelope_index
+
+
+def expected_gain(
+    p,
+    payoff_per_arm,
+    cost_per_arm,
+    rate_per_arm,
+    method="chunked",
+    chunk=2**20,
+    return_arm=False,
+):
+    """
+    Evaluate the maximal expected gain for every belief in p. With method
+    "chunked" the gains of at most chunk (belief, arm) pairs are computed
+    at once, with method "envelope" the maximizing arm is looked up on
+    the upper envelope of the gain lines.
+    Returns: the maximal expected gain for every belief and, if
+    return_arm is set, the maximizing arm (-1 if no gain is positive).
+    """
+    p = np.asarray(p, dtype=float)
+    payoff_per_arm, cost_per_arm, rate_per_arm = np.broadcast_arrays(
+        np.atleast_1d(payoff_per_arm),
+        np.atleast_1d(cost_per_arm),
+        np.atleast_1d(rate_per_arm),
+    )
+    offsets = cost_per_arm / rate_per_arm
+
+    if method == "chunked":
+        gain, arm = _chunked_gain(p, payoff_per_arm, offsets, chunk)
+    elif method == "envelope":
+        gain, arm = _envelope_gain(p, payoff_per_arm, offsets)
+    else:
+        raise ValueError(f"Unknown method: {method}")
+
+    if return_arm:
+        return gain, arm
+
+    return gain
+
+
+def _chunked_gain(p, payoff_per_arm, offsets, chunk):
+    """
+    Maximal expected gain computed in blocks of beliefs and arms.
+    """
+    N = len(payoff_per_arm)
+    cols = max(1, min(N, chunk))
+    rows = max(1, chunk // cols)
+
+    gain = np.zeros(len(p))
+    arm = np.full(len(p), -1)
+    for start in range(0, len(p), rows):
+        stop = min(start + rows, len(p))
+        block = p[start:stop, None]
+
+        for first in range(0, N, cols):
+            last = min(first + cols, N)
+            vals = payoff_per_arm[first:last] * block - offsets[first:last]
+
+            i = np.argmax(vals, axis=1)
+            best = vals[np.arange(stop - start), i]
+
+            # Only strictly larger gains replace earlier arms
+            better = best > gain[start:stop]
+            gain[start:stop][better] = best[better]
+            arm[start:stop][better] = first + i[better]
+
+    return gain, arm
+
+
+def _envelope_gain(p, payoff_per_arm, offsets):
+    """
+    Maximal expected gain looked up on the upper envelope.
+    """
+    hull, breaks = upper_envelope(payoff_per_arm, -offsets)
+    best = hull[envelope_index(breaks, p)]
+    vals = payoff_per_arm[best] * p - offsets[best]
+
+    return np.maximum(vals, 0), np.where(vals > 0, best, -1)
@@ -0,0 +1,115 @@
+"""
+Author: Mara van der Meulen
+---
+This file contains an analytic solver for the expected value and success
+probability of the optimal strategy, for a whole grid of initial beliefs
+at once. Until a breakthrough occurs the chosen arms are deterministic,
+so both follow from the survival probability along the arm schedule.
+Only a general possibility of success (b_ind=False) is supported.
+"""
+import numpy as np
+
+from continuous import logit
+from trajectory import segment_steps
+
+
+def expected_value(mab, p_vals, model="discrete", priori=False):
+    """
+    Expected value and success probability of Agent.first_strategy with
+    time steps of size mab.dt (model "discrete"), or of the strategy in
+    continuous time as in continuous.simulate (model "continuous"), for
+    every initial belief in p_vals. The priori parameter specifies
+    whether the a priori probability should match the initial belief.
+    Returns: the expected value and the probability of a breakthrough
+    for every initial belief.
+    """
+    if mab.b_ind:
+        raise ValueError("The expected value requires b_ind=False")
+    if model not in ("discrete", "continuous"):
+        raise ValueError(f"Unknown model: {model}")
+
+    p_vals = np.asarray(p_vals, dtype=float)
+    prob = p_vals if priori else np.full(len(p_vals), mab.priori)
+
+    # Value if success is possible and costs if it is not
+    value = np.zeros(len(p_vals))
+    costs = np.zeros(len(p_vals))
+    survival = np.ones(len(p_vals))
+
+    with np.errstate(divide="ignore"):
+        x = logit(np.clip(p_vals, 0, 1))
+    for arm, lower, upper in _segments(mab):
+        rate = mab.arm_rate[arm]
+        cost = mab.arm_cost[arm]
+        payoff = mab.arm_payoff[arm]
+
+        # Decrease of the belief in log-odds spent on this arm
+        if model == "discrete":
+            step = rate * mab.dt
+            n, x = segment_steps(x, lower, step)
+
+            # Every step reached costs c_i E[min(T, dt)], see MAB.timestep,
+            # and has a breakthrough with probability 1 - exp(-lambda_i dt)
+            hit = -np.expm1(-step)
+            spent = cost * hit / rate
+            reached = survival * _geometric_sum(step, n)
+
+            value += reached * (hit * payoff - spent)
+            costs += n * spent
+            survival *= np.exp(-n * step)
+        else:
+            span = np.maximum(np.minimum(x, upper) - lower, 0)
+            x = np.minimum(x, lower)
+
+            # Costs are charged until the breakthrough, see
+            # continuous.simulate
+            hit = -np.expm1(-span)
+            value += survival * hit * (payoff - cost / rate)
+            costs += cost * span / rate
+            survival *= np.exp(-span)
+
+    success = prob * (1 - survival)
+
+    return prob * value - (1 - prob) * costs, success
+
+
+def _geometric_sum(step, n):
+    """
+    Sum of exp(-j step) over the steps j = 0, ..., n - 1.
+    """
+    return -np.expm1(-n * step) / -np.expm1(-step)
+
+
+def _segments(mab):
+    """
+    Segments of the arm schedule in log-odds of the belief, in the order
+    in which they are followed by the decreasing belief.
+    Returns: an (arm, lower bound, upper bound) tuple for every segment
+    above the quit threshold.
+    """
+    hull, breaks, _, threshold = mab.envelope()
+    bounds = [_logit_bound(b) for b in breaks]
+    floor = _logit_bound(threshold)
+
+    segments = []
+    for k in range(len(hull) - 1, -1, -1):
+        upper = bounds[k] if k < len(bounds) else np.inf
+        lower = bounds[k - 1] if k > 0 else -np.inf
+        if upper <= floor:
+            break
+
+        segments.append((hull[k], max(lower, floor), upper))
+
+    return segments
+
+
+def _logit_bound(p):
+    """
+    Log-odds of a belief bound, which may lie outside [0, 1].
+    """
+    if p <= 0:
+        return -np.inf
+    if p >= 1:
+        return np.inf
+
+    return logit(p)
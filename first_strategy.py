@@ -6,79 +6,121 @@ an agent using the optimal strategy. This strategy corresponds to
 Theorem 1 in the paper Multi-Armed Exponential Bandits by Chen et al.
 """
 import numpy as np
-import matplotlib.pyplot as plt
 
-from agent import Agent
+from expected_value import expected_value
 from mab import MAB
+from result_store import ResultStore
+from sweep import sweep_stats
 import arm_settings as arm
+import plotting
 
-# Set random seed for reproducibility
-np.random.seed(56)
-
-# Number of iterations
-trials = 1000
-p_vals = np.linspace(0, 1, 41)[:-1]
-
-# MAB settings
-N = 20
-
-# Choose mode "identical", "random", "specific"
-arm_mode = "specific"
-if arm_mode == "identical":
-    payoff_per_arm, cost_per_arm, rate_per_arm = arm.setting_a()
-elif arm_mode == "random":
-    payoff_per_arm, cost_per_arm, rate_per_arm = arm.setting_b(N)
-else:
-    payoff_per_arm, cost_per_arm, rate_per_arm = arm.setting_c(N)
-
-mab = MAB(
-    N,
-    payoff_per_arm,
-    cost_per_arm,
-    rate_per_arm,
-    info=False,
-    source=(np.max(payoff_per_arm - cost_per_arm / rate_per_arm) * 0.2, 1),
-    b_ind=False,
-)
-agent = Agent(mab, 0.5)
-
-# Run experiment
-data = []
-for p in p_vals:
-    agent.p0 = p
-    agent.reset()
-
-    vals = []
-    success = 0
-    for t in range(trials):
-        agent.first_strategy()
-        vals.append(agent.mab.value)
-
-        if agent.mab.payoff != 0:
-            success += 1
-
-        agent.reset()
-    data.append(vals)
-    print(f"Successes: {success}/{trials}")
-
-# Plot the results
-_ = plt.figure(figsize=(8, 5))
-
-avg_value = np.mean(data, axis=1)
-std_value = np.std(data, axis=1)
-plt.errorbar(
-    p_vals,
-    avg_value,
-    yerr=2 * std_value / np.sqrt(trials),
-    fmt=".",
-    color="red",
-)
-
-plt.xticks(p_vals[::4])
-
-plt.title(
-    "Agent's strategy based on Theorem 1 in Multi-Armed Exponential Bandit [Chen et al]"
-)
-plt.xlabel("initial belief $p$")
-plt.ylabel("value")
-plt.show()
+P_VALS = np.linspace(0, 1, 41)[:-1]
+
+
+def run(
+    arm_mode="specific",
+    N=20,
+    trials=1000,
+    p_vals=P_VALS,
+    engine="scalar",
+    workers=None,
+    target=None,
+    progress=None,
+    cache_dir=None,
+    seed=56,
+    log=True,
+    reference=False,
+):
+    """
+    Run the experiment. The arm mode is "identical", "random" or
+    "specific". The engine is "scalar" (one trial at a time), "compiled"
+    (one trial at a time using a cached arm schedule), "batch" (all trials
+    at once), "population" (all trials of all initial beliefs at once),
+    "continuous" (event-driven in continuous time, ignores dt) or
+    "adaptive" (one trial at a time with adaptive time steps, see
+    Agent.adaptive_strategy).
+    Without workers the trials run serially on the global random state.
+    With a target half-width of the 95% confidence intervals, trials is
+    the maximal number of trials per initial belief. Results are cached
+    in cache_dir if it is set. If progress is set instead, the progress
+    is logged every progress seconds and an interrupt keeps the partial
+    results, see sweep.iter_sweep. If reference is set, the exact
+    expected value is computed as well, see expected_value.
+    Returns: the initial beliefs, a RunningStats object for each and the
+    exact expected values (None if reference is not set).
+    """
+    # Set random seed for reproducibility
+    np.random.seed(seed)
+
+    payoff_per_arm, cost_per_arm, rate_per_arm = arm.setting(arm_mode, N)
+
+    mab = MAB(
+        N,
+        payoff_per_arm,
+        cost_per_arm,
+        rate_per_arm,
+        info=False,
+        source=(
+            np.max(payoff_per_arm - cost_per_arm / rate_per_arm) * 0.2,
+            1,
+        ),
+        b_ind=False,
+    )
+
+    stats = sweep_stats(
+        mab,
+        p_vals,
+        trials,
+        engine=engine,
+        workers=workers,
+        seed=seed,
+        target=target,
+        progress=progress,
+        store=ResultStore(cache_dir) if cache_dir else None,
+        log=log,
+    )
+
+    exact = None
+    if reference:
+        # Adaptive steps charge the costs in continuous time
+        if engine in ("continuous", "adaptive"):
+            model = "continuous"
+        else:
+            model = "discrete"
+        exact, _ = expected_value(mab, p_vals, model=model)
+
+    return p_vals, stats, exact
+
+
+def plot(result, out=None):
+    """
+    Plot the results of run, the figure is saved to out if it is set.
+    """
+    p_vals, stats, exact = result
+    plt = plotting.pyplot(headless=out is not None)
+
+    _ = plt.figure(figsize=(8, 5))
+
+    plt.errorbar(
+        p_vals,
+        [s.mean for s in stats],
+        yerr=[s.ci() for s in stats],
+        fmt=".",
+        color="red",
+    )
+    if exact is not None:
+        plt.plot(p_vals, exact, color="black", label="expected value")
+        plt.legend()
+
+    plt.xticks(p_vals[::4])
+
+    plt.title(
+        "Agent's strategy based on Theorem 1 in Multi-Armed Exponential Bandit [Chen et al]"
+    )
+    plt.xlabel("initial belief $p$")
+    plt.ylabel("value")
+    plotting.finish(plt, out)
+
+
+if __name__ == "__main__":
+    plot(run())
@@ -4,41 +4,44 @@ Author: Mara van der Meulen
 Plot the maximal expected gain over all projects/arms.
 """
 import numpy as np
-import matplotlib.pyplot as plt
 
 import arm_settings as arm
+from expected_gain import expected_gain
+import plotting
 
-# MAB settings
-N = 20
 
-# Choose mode "identical", "random", "specific"
-arm_mode = "specific"
-if arm_mode == "identical":
-    payoff_per_arm, cost_per_arm, rate_per_arm = arm.setting_a()
-elif arm_mode == "random":
-    payoff_per_arm, cost_per_arm, rate_per_arm = arm.setting_b(N)
-else:
-    payoff_per_arm, cost_per_arm, rate_per_arm = arm.setting_c(N)
-
-
-def plot_gain(N, payoff_per_arm, cost_per_arm, rate_per_arm, info=False):
+def run(arm_mode="specific", N=20, info=False):
     """
-    Plot the maximal expected gain over all arms given their parameters.
+    Compute the maximal expected gain over all arms for the arm mode
+    "identical", "random" or "specific".
+    Returns: the beliefs, the maximal expected gain for each belief and
+    the payoff of the information source (None if info is not set).
     """
+    payoff_per_arm, cost_per_arm, rate_per_arm = arm.setting(arm_mode, N)
+
     p = np.linspace(0, 1, N + 1)
+    gain = expected_gain(p, payoff_per_arm, cost_per_arm, rate_per_arm)
 
-    gain = np.max(
-        payoff_per_arm * np.vstack(p) - cost_per_arm / rate_per_arm,
-        axis=1,
-        initial=0,
-    )
+    source_payoff = None
+    if info:
+        source_payoff = np.max(payoff_per_arm - cost_per_arm / rate_per_arm)
+
+    return p, gain, source_payoff
+
+
+def plot(result, out=None):
+    """
+    Plot the maximal expected gain over all arms given their parameters,
+    the figure is saved to out if it is set.
+    """
+    p, gain, source_payoff = result
+    plt = plotting.pyplot(headless=out is not None)
 
     _ = plt.figure(figsize=(7, 5))
     plt.plot(p, gain, label="projects")
     plt.ylim(-5, 60)
 
-    if info:
-        source_payoff = np.max(payoff_per_arm - cost_per_arm / rate_per_arm)
+    if source_payoff is not None:
         source_gain = source_payoff * p - (source_payoff * 0.2)
         plt.plot(p, source_gain, label="source")
 
@@ -53,7 +56,8 @@ def plot_gain(N, payoff_per_arm, cost_per_arm, rate_per_arm, info=False):
     plt.ylabel(
         "expected gain $\max \{0,\ max_i \{\pi_i p - \dfrac{c_i}{\lambda_i}\}\}$"
     )
-    plt.show()
+    plotting.finish(plt, out)
 
 
-plot_gain(N, payoff_per_arm, cost_per_arm, rate_per_arm)
+if __name__ == "__main__":
+    plot(run())
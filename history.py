@@ -0,0 +1,61 @@
+"""
+Author: Mara van der Meulen
+---
+This file contains a class storing the history of an agent's belief,
+either completely, in a reusable buffer or not at all.
+"""
+import numpy as np
+
+
+class History:
+    def __init__(self, mode="full", capacity=1024):
+        """
+        Mode "full" keeps every value in a list, "preallocated" keeps
+        every value in a float64 buffer that is reused after a reset and
+        grows when full, "none" only keeps the current value.
+        """
+        if mode not in ("full", "preallocated", "none"):
+            raise ValueError(f"Unknown history mode: {mode}")
+
+        self.mode = mode
+        self.last = 0.0
+        self.size = 0
+        self.buffer = np.empty(
+            max(capacity, 1) if mode == "preallocated" else 0
+        )
+        self.list = []
+
+    def reset(self, value):
+        """
+        Start a new history with the given initial value.
+        """
+        self.last = value
+        self.size = 1
+
+        if self.mode == "full":
+            self.list = [value]
+        elif self.mode == "preallocated":
+            self.buffer[0] = value
+
+    def append(self, value):
+        self.last = value
+        self.size += 1
+
+        if self.mode == "full":
+            self.list.append(value)
+        elif self.mode == "preallocated":
+            if self.size > len(self.buffer):
+                self.buffer = np.resize(self.buffer, 2 * len(self.buffer))
+            self.buffer[self.size - 1] = value
+
+    def values(self):
+        """
+        The stored values. In mode "preallocated" this is a view of the
+        buffer, which is overwritten after the next reset.
+        """
+        if self.mode == "full":
+            return self.list
+        if self.mode == "preallocated":
+            return self.buffer[: self.size]
+
+        return [self.last]
@@ -0,0 +1,126 @@
+"""
+Author: Mara van der Meulen
+---
+This file contains opt-in instrumentation for the agent's strategies:
+counters over all trials and a fixed-size buffer of per-trial events.
+"""
+from collections import deque
+import csv
+import json
+
+COUNTERS = (
+    "trials",
+    "steps",
+    "arm_switches",
+    "breakthroughs",
+    "threshold_quits",
+    "random_quits",
+    "timestep_time",
+    "belief_time",
+)
+
+
+class Instrumentation:
+    def __init__(self, capacity=1000, timing=True):
+        """
+        Keep the events of the last capacity trials. If timing is set,
+        the time spent in MAB.timestep and in the belief updates is
+        measured as well.
+        """
+        self.timing = timing
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.events = deque(maxlen=capacity)
+
+        self._trial = None
+
+    def start_trial(self, p0, strategy):
+        """
+        Start recording a trial with initial belief p0.
+        """
+        self._trial = dict(
+            trial=self.counters["trials"],
+            strategy=strategy,
+            p0=float(p0),
+            steps=0,
+            arm_switches=0,
+            first_arm=None,
+            last_arm=None,
+            arms_used=set(),
+        )
+        self.counters["trials"] += 1
+
+    def step(self, arm):
+        """
+        Record a timestep in which arm is pulled.
+        """
+        trial = self._trial
+        if trial["steps"] == 0:
+            trial["first_arm"] = int(arm)
+        elif arm != trial["last_arm"]:
+            trial["arm_switches"] += 1
+            self.counters["arm_switches"] += 1
+
+        trial["last_arm"] = int(arm)
+        trial["arms_used"].add(int(arm))
+        trial["steps"] += 1
+        self.counters["steps"] += 1
+
+    def add_steps(self, arms):
+        """
+        Record the arms pulled in steps that were not simulated one by one.
+        """
+        for arm in arms:
+            self.step(arm)
+
+    def end_trial(self, mab, reason):
+        """
+        Finish the current trial, reason is "breakthrough", "threshold"
+        or "random" (the baseline strategy quit).
+        """
+        trial = self._trial
+        trial["arms_used"] = len(trial["arms_used"])
+        trial["stop_step"] = trial["steps"]
+        trial["reason"] = reason
+        trial["value"] = float(mab.value)
+
+        if reason == "breakthrough":
+            self.counters["breakthroughs"] += 1
+        elif reason == "threshold":
+            self.counters["threshold_quits"] += 1
+        else:
+            self.counters["random_quits"] += 1
+
+        self.events.append(trial)
+        self._trial = None
+
+    def to_dict(self):
+        return dict(counters=dict(self.counters), events=list(self.events))
+
+    def to_json(self, path):
+        """
+        Save the counters and events to a JSON file.
+        """
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def to_csv(self, path):
+        """
+        Save the events to a CSV file, one row per trial.
+        """
+        fields = [
+            "trial",
+            "strategy",
+            "p0",
+            "steps",
+            "arm_switches",
+            "first_arm",
+            "last_arm",
+            "arms_used",
+            "stop_step",
+            "reason",
+            "value",
+        ]
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(self.events)
@@ -4,8 +4,13 @@ Author: Mara van der Meulen
 This file contains a class representing a Multi-Armed
 Exponential Bandit model.
 """
+from bisect import bisect_left
+
 import numpy as np
 
+from envelope import arm_envelope
+from variates import Variates
+
 
 class MAB:
     def __init__(
@@ -19,12 +24,17 @@ class MAB:
         source=(0, 0),
         b_ind=False,
         log=False,
+        rng=None,
     ):
         self.N = N
 
-        self.arm_payoff = np.resize(payoff, N)
-        self.arm_cost = np.resize(cost, N)
-        self.arm_rate = np.resize(rate, N)
+        # Random variates, drawn from rng if a Generator is given
+        self.random = Variates(rng)
+
+        # Arrays of N arm parameters are used without copying them
+        self.arm_payoff = _arm_array(payoff, N)
+        self.arm_cost = _arm_array(cost, N)
+        self.arm_rate = _arm_array(rate, N)
 
         self.costs = 0
         self.payoff = 0
@@ -44,37 +54,204 @@ class MAB:
             self.arm_cost = np.append(self.arm_cost, source[0])
             self.arm_rate = np.append(self.arm_rate, source[1])
 
-        self.x = np.zeros(self.N)
+        # Selected arm, or None if an allocation vector is used
+        self.arm = None
+        self._x = None
+
+        # Upper envelope of the arm gains, computed on first use
+        self._envelope_key = None
+        # ArmTable the arms are taken from, see from_table
+        self.table = None
 
         self.priori = priori
         # If set, possibility of succes is arm dependent
         self.b_ind = b_ind
         if b_ind:
-            self.arm_success = np.random.binomial(1, priori, self.N)
+            self.arm_success = self.random.binomial(1, priori, self.N)
         else:
-            self.arm_success = np.resize(
-                np.random.binomial(1, priori, 1), self.N
+            self.arm_success = np.broadcast_to(
+                self.random.binomial(1, priori, 1), self.N
+            )
+
+    @classmethod
+    def from_table(cls, table, **kwargs):
+        """
+        Model with the arms of an ArmTable, which are not copied unless an
+        information source is added. The envelope of the table is reused.
+        """
+        mab = cls(len(table), table.payoff, table.cost, table.rate, **kwargs)
+        if mab.arm_payoff is table.payoff:
+            mab.table = table
+            mab._envelope = table.envelope()
+            mab._envelope_key = (mab.arm_payoff, mab.arm_cost, mab.arm_rate)
+
+        return mab
+
+    def __getstate__(self):
+        """
+        Arms that are still those of the table of the model are pickled
+        with the table, so that a memory-mapped table is not copied.
+        """
+        state = self.__dict__.copy()
+        if self.table is not None and self._table_arms():
+            for name in ("arm_payoff", "arm_cost", "arm_rate", "_envelope"):
+                state.pop(name, None)
+            state["_envelope_key"] = None
+        # A common success is pickled once instead of for every arm
+        if not self.b_ind:
+            state["arm_success"] = self.arm_success[:1].copy()
+
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if not self.b_ind:
+            self.arm_success = np.broadcast_to(self.arm_success, self.N)
+        if "arm_payoff" not in state:
+            self.arm_payoff, self.arm_cost, self.arm_rate = (
+                self.table.columns()
+            )
+            self._envelope = self.table.envelope()
+            self._envelope_key = (
+                self.arm_payoff,
+                self.arm_cost,
+                self.arm_rate,
             )
 
+    def _table_arms(self):
+        """
+        Returns: whether the arm parameter arrays are those of the table.
+        """
+        return (
+            self.arm_payoff is self.table.payoff
+            and self.arm_cost is self.table.cost
+            and self.arm_rate is self.table.rate
+        )
+
+    def envelope(self):
+        """
+        Upper envelope of the lines lambda_i p - c_i / lambda_i maximized
+        by the optimal strategy, together with the quit threshold. The
+        envelope is cached until one of the arm parameter arrays is
+        replaced, arrays that are modified in place are not detected.
+        Returns: the arm indices on the envelope, the beliefs at which
+        the envelope switches arms, c_i / lambda_i for all arms and the
+        quit threshold.
+        """
+        key = self._envelope_key
+        if (
+            key is None
+            or key[0] is not self.arm_payoff
+            or key[1] is not self.arm_cost
+            or key[2] is not self.arm_rate
+        ):
+            self._envelope = arm_envelope(
+                self.arm_payoff, self.arm_cost, self.arm_rate
+            )
+            self._envelope_key = (
+                self.arm_payoff,
+                self.arm_cost,
+                self.arm_rate,
+            )
+
+        return self._envelope
+
+    def threshold(self):
+        """
+        Belief below which all arms have a negative expected gain.
+        """
+        return self.envelope()[3]
+
+    def best_arm(self, p):
+        """
+        Arm maximizing lambda_i p - c_i / lambda_i for belief p, ties are
+        broken towards the lowest index like np.argmax.
+        """
+        hull, breaks, ratio, _ = self.envelope()
+        k = bisect_left(breaks, p)
+
+        # Compare with the envelope neighbours to settle rounding near
+        # the breakpoints exactly as an argmax over all arms would
+        best = hull[k]
+        val = self.arm_rate[best] * p - ratio[best]
+        for j in (k - 1, k + 1):
+            if 0 <= j < len(hull):
+                arm = hull[j]
+                other = self.arm_rate[arm] * p - ratio[arm]
+                if other > val or (other == val and arm < best):
+                    best, val = arm, other
+
+        return best
+
+    def best_arms(self, p):
+        """
+        Vectorized version of best_arm for an array of beliefs.
+        """
+        hull, breaks, ratio, _ = self.envelope()
+        k = np.searchsorted(breaks, p, side="left")
+
+        best = hull[k]
+        val = self.arm_rate[best] * p - ratio[best]
+        for j in (k - 1, k + 1):
+            arm = hull[np.clip(j, 0, len(hull) - 1)]
+            other = self.arm_rate[arm] * p - ratio[arm]
+            better = (other > val) | ((other == val) & (arm < best))
+            best = np.where(better, arm, best)
+            val = np.where(better, other, val)
+
+        return best
+
     def select_arm(self, i):
         """
         Select arm i.
         """
-        self.x = np.zeros(self.N)
-        self.x[i] = 1
+        self.arm = i
+
+    def allocate(self, x):
+        """
+        Allocate resources over the arms according to the vector x,
+        which may be fractional.
+        """
+        self.arm = None
+        self._x = np.asarray(x, dtype=float)
+
+    @property
+    def x(self):
+        """
+        Resource allocation vector over all arms.
+        """
+        if self.arm is not None:
+            x = np.zeros(self.N)
+            x[self.arm] = 1
+            return x
+        if self._x is None:
+            return np.zeros(self.N)
+
+        return self._x
+
+    def selected_rate(self):
+        """
+        Breakthrough rate of the current resource allocation.
+        """
+        if self.arm is not None:
+            return self.arm_rate[self.arm]
+
+        return np.sum(self.arm_rate * self.x)
 
     def reset(self):
         """
         Resets the multi-armed bandit game.
         """
+        self.random.next_trial()
         if self.b_ind:
-            self.arm_success = np.random.binomial(1, self.priori, self.N)
+            self.arm_success = self.random.binomial(1, self.priori, self.N)
         else:
-            self.arm_success = np.resize(
-                np.random.binomial(1, self.priori, 1), self.N
+            self.arm_success = np.broadcast_to(
+                self.random.binomial(1, self.priori, 1), self.N
             )
 
-        self.x = np.zeros(self.N)
+        self.arm = None
+        self._x = None
 
         self.costs = 0
         self.payoff = 0
@@ -87,7 +264,10 @@ class MAB:
         occurs, calculate payoff and update model.
         Returns: 1 if a breakthrough occurs, 0 otherwise.
         """
-        time = np.random.exponential(1 / np.sum(self.arm_rate * self.x))
+        if self.arm is not None:
+            return self._arm_timestep(self.arm)
+
+        time = self.random.exponential(1 / np.sum(self.arm_rate * self.x))
 
         # Determine costs
         self.costs += np.sum(
@@ -104,6 +284,52 @@ class MAB:
 
         return 0
 
+    def _arm_timestep(self, i):
+        """
+        Timestep in which all resources are allocated to arm i.
+        """
+        time = self.random.exponential(1 / self.arm_rate[i])
+
+        # Determine costs
+        self.costs += self.arm_cost[i] * min(time, self.dt)
+
+        # Probability of breakthrough explained in Section 3.2
+        if self.arm_success[i] == 1 and time < self.dt:
+            self.payoff += self.arm_payoff[i]
+
+            return 1
+
+        return 0
+
+    def interval(self, dt):
+        """
+        Simulate a time interval of size dt in continuous time, used for
+        steps of varying size. Unlike timestep, the costs are charged
+        until the end of the interval when no breakthrough occurs, such
+        that large intervals are not biased.
+        Returns: 1 if a breakthrough occurs, 0 otherwise.
+        """
+        if self.arm is not None:
+            cost = self.arm_cost[self.arm]
+            payoff = self.arm_payoff[self.arm]
+            possible = self.arm_success[self.arm]
+        else:
+            cost = np.sum(self.x * self.arm_cost)
+            payoff = np.sum(self.x * self.arm_payoff)
+            possible = np.sum(self.x * self.arm_success)
+
+        time = self.random.exponential(1 / self.selected_rate())
+
+        if possible == 1 and time < dt:
+            self.costs += cost * time
+            self.payoff += payoff
+
+            return 1
+
+        self.costs += cost * dt
+
+        return 0
+
     def quit(self):
         """
         The agent quits, this can be interpreted equivalently with
@@ -117,3 +343,13 @@ class MAB:
         self.value = self.payoff - self.costs
 
         return
+
+
+def _arm_array(values, N):
+    """
+    Parameter values for N arms, repeated if fewer values are given.
+    """
+    if isinstance(values, np.ndarray) and values.shape == (N,):
+        return values
+
+    return np.resize(values, N)
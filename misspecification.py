@@ -7,39 +7,27 @@ priori probability of succes being set to match the initial belief. The a
 priori probability refers to the probability that success is possible.
 """
 import numpy as np
-import matplotlib.pyplot as plt
 
-from agent import Agent
 from mab import MAB
+from result_store import ResultStore
+from sweep import paired_curves, sweep_stats
 import arm_settings as arm
+import plotting
 
-# Set random seed for reproducibility
-np.random.seed(56)
+P_VALS = np.linspace(0, 1, 41)[:-1]
 
-trials = 1000
-p_vals = np.linspace(0, 1, 41)[:-1]
-N = 20
-
-# Choose mode "identical", "random", "specific"
-arm_mode = "specific"
-if arm_mode == "identical":
-    payoff_per_arm, cost_per_arm, rate_per_arm = arm.setting_a()
-elif arm_mode == "random":
-    payoff_per_arm, cost_per_arm, rate_per_arm = arm.setting_b(N)
-else:
-    payoff_per_arm, cost_per_arm, rate_per_arm = arm.setting_c(N)
+VARIANTS = (
+    ("misspecification", False),
+    ("priori matches initial belief", True),
+)
 
 
-def plot_values(
-    N, payoff_per_arm, cost_per_arm, rate_per_arm, label, priori=False
-):
+def model(N, payoff_per_arm, cost_per_arm, rate_per_arm):
     """
-    Plot the average eventual value of an agent using the optimal strategy
-    when the MAB model is set according to the specified parameters. The
-    priori parameter specifies whether the a priori probability should match
-    the initial belief.
+    MAB model shared by both variants, which only differ in the a priori
+    probability.
     """
-    mab = MAB(
+    return MAB(
         N,
         payoff_per_arm,
         cost_per_arm,
@@ -47,66 +35,122 @@ def plot_values(
         b_ind=False,
     )
 
-    agent = Agent(mab, 0.5)
-
-    # Run experiment
-    data = []
-    for p in p_vals:
-        agent.p0 = p
-        if priori:
-            agent.mab.priori = p
-        agent.reset()
-
-        vals = []
-        success = 0
-        for _ in range(trials):
-            agent.first_strategy()
-            vals.append(agent.mab.value)
-
-            if agent.mab.payoff != 0:
-                success += 1
-
-            agent.reset()
-        data.append(vals)
-        print(f"Successes: {success}/{trials}")
-
-    avg_value = np.mean(data, axis=1)
-    std_value = np.std(data, axis=1)
-    plt.errorbar(
-        p_vals,
-        avg_value,
-        yerr=2 * std_value / np.sqrt(trials),
-        fmt=".",
-        label=label,
-    )
-
-
-# Plot the results
-_ = plt.figure(figsize=(8, 5))
 
-plot_values(
+def run_values(
     N,
     payoff_per_arm,
     cost_per_arm,
     rate_per_arm,
-    "misspecification",
     priori=False,
-)
-plot_values(
-    N,
-    payoff_per_arm,
-    cost_per_arm,
-    rate_per_arm,
-    "priori matches initial belief",
-    priori=True,
-)
+    trials=1000,
+    p_vals=P_VALS,
+    engine="scalar",
+    workers=None,
+    target=None,
+    progress=None,
+    cache_dir=None,
+    seed=56,
+    log=True,
+):
+    """
+    Compute the average eventual value of an agent using the optimal
+    strategy when the MAB model is set according to the specified
+    parameters. The priori parameter specifies whether the a priori
+    probability should match the initial belief.
+    Returns: a RunningStats object for every initial belief.
+    """
+    mab = model(N, payoff_per_arm, cost_per_arm, rate_per_arm)
 
-plt.xticks(p_vals[::4])
+    return sweep_stats(
+        mab,
+        p_vals,
+        trials,
+        priori=priori,
+        engine=engine,
+        workers=workers,
+        seed=seed,
+        target=target,
+        progress=progress,
+        store=ResultStore(cache_dir) if cache_dir else None,
+        log=log,
+    )
 
-plt.title(
-    "Agent's strategy based on Theorem 1 in Multi-Armed Exponential Bandit [Chen et al]"
-)
-plt.xlabel("initial belief $p$")
-plt.ylabel("value")
-plt.legend()
-plt.show()
+
+def run(
+    arm_mode="specific",
+    N=20,
+    trials=1000,
+    p_vals=P_VALS,
+    engine="scalar",
+    workers=None,
+    target=None,
+    progress=None,
+    cache_dir=None,
+    seed=56,
+    log=True,
+    common=False,
+):
+    """
+    Run the experiment with and without matching a priori probability,
+    see first_strategy.run for the options and baseline.run for common.
+    Returns: the initial beliefs, a (label, RunningStats objects) pair
+    for both variants and a list of such pairs for the paired
+    differences, which is empty unless common is set.
+    """
+    # Set random seed for reproducibility
+    np.random.seed(seed)
+
+    payoff_per_arm, cost_per_arm, rate_per_arm = arm.setting(arm_mode, N)
+
+    if common:
+        mab = model(N, payoff_per_arm, cost_per_arm, rate_per_arm)
+        variants = [(mab, 0, priori) for _, priori in VARIANTS]
+        labels = [label for label, _ in VARIANTS]
+        curves, differences = paired_curves(
+            labels,
+            variants,
+            p_vals,
+            trials,
+            engine=engine,
+            workers=workers,
+            seed=seed,
+            log=log,
+            target=target,
+            progress=progress,
+            cache_dir=cache_dir,
+        )
+
+        return p_vals, curves, differences
+
+    curves = []
+    for label, priori in VARIANTS:
+        stats = run_values(
+            N,
+            payoff_per_arm,
+            cost_per_arm,
+            rate_per_arm,
+            priori=priori,
+            trials=trials,
+            p_vals=p_vals,
+            engine=engine,
+            workers=workers,
+            target=target,
+            progress=progress,
+            cache_dir=cache_dir,
+            seed=seed,
+            log=log,
+        )
+        curves.append((label, stats))
+
+    return p_vals, curves, []
+
+
+def plot(result, out=None):
+    """
+    Plot the results of run, the figure is saved to out if it is set.
+    """
+    plotting.plot_curves(result, out)
+
+
+if __name__ == "__main__":
+    plot(run())
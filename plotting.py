@@ -0,0 +1,91 @@
+"""
+Author: Mara van der Meulen
+---
+This file contains helper functions for plotting, matplotlib is only
+imported once a figure is actually rendered.
+"""
+
+
+def pyplot(headless=False):
+    """
+    Import matplotlib.pyplot, using a non-interactive backend if the
+    figure is only saved to a file.
+    """
+    import matplotlib
+
+    if headless:
+        matplotlib.use("Agg")
+
+    import matplotlib.pyplot as plt
+
+    return plt
+
+
+def finish(plt, out=None):
+    """
+    Show the current figure, or save it to the file out.
+    """
+    if out is None:
+        plt.show()
+    else:
+        plt.savefig(out)
+        plt.close()
+
+
+def plot_curves(result, out=None):
+    """
+    Plot the value of every curve with 95% confidence intervals, and the
+    paired differences below if there are any. The result is an (initial
+    beliefs, curves, differences) tuple, where the curves and differences
+    are lists of (label, RunningStats objects) pairs. The figure is saved
+    to out if it is set.
+    """
+    p_vals, curves, differences = result
+    plt = pyplot(headless=out is not None)
+
+    _ = plt.figure(figsize=(8, 9 if differences else 5))
+    if differences:
+        plt.subplot(2, 1, 1)
+    for label, stats in curves:
+        plt.errorbar(
+            p_vals,
+            [s.mean for s in stats],
+            yerr=[s.ci() for s in stats],
+            fmt=".",
+            label=label,
+        )
+
+    plt.xticks(p_vals[::4])
+
+    plt.title(
+        "Agent's strategy based on Theorem 1 in Multi-Armed Exponential Bandit [Chen et al]"
+    )
+    plt.xlabel("initial belief $p$")
+    plt.ylabel("value")
+    plt.legend()
+    if differences:
+        plot_differences(plt, p_vals, differences)
+    finish(plt, out)
+
+
+def plot_differences(plt, p_vals, differences):
+    """
+    Plot paired differences in value with 95% confidence intervals below
+    the current axes, differences is a list of (label, RunningStats
+    objects) pairs.
+    """
+    plt.subplot(2, 1, 2)
+    for label, stats in differences:
+        plt.errorbar(
+            p_vals,
+            [s.mean for s in stats],
+            yerr=[s.ci() for s in stats],
+            fmt=".",
+            label=label,
+        )
+    plt.axhline(0, color="black", linewidth=0.5)
+
+    plt.xticks(p_vals[::4])
+    plt.xlabel("initial belief $p$")
+    plt.ylabel("paired difference in value")
+    plt.legend()
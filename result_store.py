@@ -0,0 +1,157 @@
+"""
+Author: Mara van der Meulen
+---
+This file contains an on-disk store for the results of experiments,
+keyed by a hash of the full experiment configuration.
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from stats import RunningStats
+
+# Source files whose contents determine the simulation results
+SOURCES = (
+    "agent.py",
+    "arm_index.py",
+    "batch.py",
+    "continuous.py",
+    "envelope.py",
+    "history.py",
+    "mab.py",
+    "schedule.py",
+    "simulation.py",
+    "stats.py",
+    "sweep.py",
+    "variates.py",
+)
+
+
+def code_version():
+    """
+    Hash of the source files of the simulation.
+    """
+    digest = hashlib.sha256()
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for name in SOURCES:
+        with open(os.path.join(directory, name), "rb") as f:
+            digest.update(f.read())
+
+    return digest.hexdigest()[:16]
+
+
+def config_hash(config):
+    """
+    Hash of an experiment configuration, arrays are hashed by value.
+    """
+
+    def convert(value):
+        if isinstance(value, np.ndarray):
+            return value.tolist()
+        if isinstance(value, np.generic):
+            return value.item()
+        raise TypeError(f"Cannot hash {type(value)}")
+
+    text = json.dumps(config, sort_keys=True, default=convert)
+
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class ResultStore:
+    def __init__(self, directory, max_bytes=2**30):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, config, p):
+        """
+        File holding the results for initial belief p.
+        """
+        key = config_hash(dict(config, p0=float(p)))
+
+        return os.path.join(self.directory, key + ".npz")
+
+    def load(self, config, p):
+        """
+        Load the statistics for initial belief p.
+        Returns: a RunningStats object, or None if nothing is stored.
+        """
+        path = self.path(config, p)
+        if not os.path.exists(path):
+            return None
+
+        with np.load(path) as data:
+            stats = RunningStats()
+            stats.count = int(data["count"])
+            stats.mean = float(data["mean"])
+            stats.m2 = float(data["m2"])
+            stats.successes = int(data["successes"])
+            stats.min = float(data["min"])
+            stats.max = float(data["max"])
+
+        # Mark as recently used for the eviction order
+        os.utime(path)
+
+        return stats
+
+    def load_values(self, config, p):
+        """
+        Load the raw values for initial belief p, if they were stored.
+        """
+        path = self.path(config, p)
+        if not os.path.exists(path):
+            return None
+
+        with np.load(path) as data:
+            if "values" not in data:
+                return None
+            return data["values"]
+
+    def save(self, config, p, stats, values=None):
+        """
+        Save the statistics, and optionally the raw values, for initial
+        belief p. Least recently used results are evicted once the
+        store exceeds max_bytes.
+        """
+        arrays = dict(
+            count=stats.count,
+            mean=stats.mean,
+            m2=stats.m2,
+            successes=stats.successes,
+            min=stats.min,
+            max=stats.max,
+        )
+        if values is not None:
+            arrays["values"] = np.asarray(values)
+
+        path = self.path(config, p)
+        np.savez_compressed(path + ".tmp.npz", **arrays)
+        os.replace(path + ".tmp.npz", path)
+
+        self.evict()
+
+    def evict(self):
+        """
+        Remove least recently used results until the store fits.
+        """
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".npz") and not name.endswith(".tmp.npz"):
+                path = os.path.join(self.directory, name)
+                info = os.stat(path)
+                files.append((info.st_mtime, info.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith(".npz"):
+                os.remove(os.path.join(self.directory, name))
@@ -0,0 +1,180 @@
+"""
+Author: Mara van der Meulen
+---
+This file contains a compiled arm schedule for the optimal strategy with
+discrete time steps. For a fixed initial belief, arm parameters and dt
+the chosen arms and the agent's belief are identical in every trial until
+a breakthrough occurs, so they are computed once and cached.
+"""
+from collections import OrderedDict
+
+import numpy as np
+
+
+class Schedule:
+    def __init__(self, mab, p0):
+        """
+        Compile the schedule by following Agent.first_strategy without
+        breakthroughs until the belief crosses the quit threshold.
+        """
+        self.p0 = p0
+        self.dt = mab.dt
+
+        threshold = mab.threshold()
+
+        arms = []
+        p = p0
+        exponent = 0
+        p_bay = [p0]
+        p_upd = [p0]
+        while p > threshold:
+            # Choose project i that maximizes (pi_i p - c_i / lambda_i)
+            i = mab.best_arm(p)
+            arms.append(i)
+
+            # Equation 2.12 and Equation 2.11 in Section 2.3
+            rate = mab.arm_rate[i]
+            prev = p_upd[-1]
+            p_upd.append(prev - (prev * (1 - prev) * rate * mab.dt))
+
+            exponent += rate * mab.dt
+            prob = p0 * np.exp(-exponent)
+            p = prob / (prob + (1 - p0))
+            p_bay.append(p)
+
+        self.arms = np.array(arms, dtype=int)
+        self.p_bay = np.array(p_bay)
+        self.p_upd = np.array(p_upd)
+
+        # Per step hazard and costs when no breakthrough occurs
+        self.rate = mab.arm_rate[self.arms] * 1.0
+        self.cost = mab.arm_cost[self.arms] * 1.0
+        self.hazard = np.cumsum(self.rate * self.dt)
+        self.costs = np.concatenate(([0], np.cumsum(self.cost * self.dt)))
+
+        # Consecutive steps with the same arm form a segment
+        change = np.flatnonzero(np.diff(self.arms)) + 1
+        self.seg_start = np.concatenate(([0], change)).astype(int)
+        self.seg_start = self.seg_start[: len(self.arms)]
+        self.seg_len = np.diff(np.append(self.seg_start, len(self.arms)))
+        self.seg_arm = self.arms[self.seg_start]
+
+    def __len__(self):
+        return len(self.arms)
+
+    def sample(self, mab):
+        """
+        Simulate a single trial on the MAB model, whose success flags
+        are already drawn. Charges costs and payoff to the model.
+        Returns: the number of steps taken.
+        """
+        if len(self.arms) == 0:
+            return 0
+
+        if mab.b_ind:
+            return self._sample_segments(mab)
+
+        draw = mab.random.exponential()
+        if mab.arm_success[0] == 1 and draw < self.hazard[-1]:
+            # Breakthrough during step k, at time t within that step
+            k = np.searchsorted(self.hazard, draw, side="right")
+            before = self.hazard[k - 1] if k > 0 else 0
+            mab.costs += self.costs[k] + self.cost[k] * (
+                (draw - before) / self.rate[k]
+            )
+            mab.payoff += mab.arm_payoff[self.arms[k]]
+
+            return k + 1
+
+        if mab.arm_success[0] == 1:
+            mab.costs += self.costs[-1]
+        else:
+            for i in range(len(self.seg_arm)):
+                mab.costs += self._no_success_costs(mab, i)
+
+        return len(self.arms)
+
+    def _sample_segments(self, mab):
+        """
+        Simulate a single trial segment by segment, where success
+        is only possible on some arms.
+        """
+        draw = mab.random.exponential()
+        for i, arm in enumerate(self.seg_arm):
+            n = self.seg_len[i]
+            rate = mab.arm_rate[arm]
+
+            if mab.arm_success[arm] != 1:
+                mab.costs += self._no_success_costs(mab, i)
+                continue
+
+            if draw < n * rate * self.dt:
+                j = min(int(draw / (rate * self.dt)), n - 1)
+                time = (draw - j * rate * self.dt) / rate
+                mab.costs += mab.arm_cost[arm] * (j * self.dt + time)
+                mab.payoff += mab.arm_payoff[arm]
+
+                return self.seg_start[i] + j + 1
+
+            draw -= n * rate * self.dt
+            mab.costs += mab.arm_cost[arm] * n * self.dt
+
+        return len(self.arms)
+
+    def _no_success_costs(self, mab, i):
+        """
+        Costs of segment i when no breakthrough is possible. A step only
+        costs its full length if the exponential time exceeds dt.
+        """
+        n = self.seg_len[i]
+        rate = self.rate[self.seg_start[i]]
+        cost = self.cost[self.seg_start[i]]
+
+        # Number of steps with time < dt, each a truncated exponential
+        short = 1 - np.exp(-rate * self.dt)
+        k = mab.random.binomial(n, short)
+        time = -np.log1p(-mab.random.uniform(size=k) * short) / rate
+
+        return cost * ((n - k) * self.dt + np.sum(time))
+
+
+class ScheduleCache:
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self.tables = OrderedDict()
+
+    def get(self, mab, p0):
+        """
+        Return the compiled schedule for the model and initial belief,
+        compiling it if it is not cached. The least recently used
+        schedule is evicted once the cache is full. Only the arms on the
+        envelope can be chosen, so the key does not depend on the other
+        arms apart from the quit threshold.
+        """
+        hull, _, _, threshold = mab.envelope()
+        key = (
+            float(p0),
+            float(mab.dt),
+            float(threshold),
+            hull.tobytes(),
+            mab.arm_payoff[hull].tobytes(),
+            mab.arm_cost[hull].tobytes(),
+            mab.arm_rate[hull].tobytes(),
+        )
+
+        if key in self.tables:
+            self.tables.move_to_end(key)
+            return self.tables[key]
+
+        table = Schedule(mab, p0)
+        self.tables[key] = table
+        if len(self.tables) > self.maxsize:
+            self.tables.popitem(last=False)
+
+        return table
+
+    def clear(self):
+        self.tables.clear()
+
+
+cache = ScheduleCache()
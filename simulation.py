@@ -0,0 +1,107 @@
+"""
+Author: Mara van der Meulen
+---
+This file contains helper functions to run repeated trials of an
+agent interacting with its Multi-Armed Bandit model.
+"""
+import numpy as np
+
+from batch import BatchAgent, BatchMAB
+import continuous
+
+# Tolerance of the adapted belief in the "adaptive" engine, the arm choices
+# use the exact Bayesian belief and do not depend on it
+ADAPTIVE_TOL = 1e-2
+
+
+def run_trials(agent, trials, base=0, engine="scalar"):
+    """
+    Run a number of trials for the agent's current initial belief. The
+    base parameter indicates the strategy (0: optimal, 1: random baseline,
+    2: minimal costs baseline, 3: optimal with a belief per arm), the
+    engine parameter whether trials are simulated one by one ("scalar"),
+    one by one using a compiled arm schedule ("compiled"), all at once
+    ("batch"), event-driven in continuous time without time steps
+    ("continuous") or one by one with adaptive time steps ("adaptive",
+    see Agent.adaptive_strategy with tolerance ADAPTIVE_TOL). The last two only support the optimal
+    strategy. For a single initial belief the "population" engine of
+    sweep.sweep_stats is the batch engine.
+    An Instrumentation object of the agent is only supported if the
+    trials are simulated by the agent, see simulated_by_agent.
+    Returns: the value of every trial and the number of successes.
+    """
+    if agent.instrument is not None and not simulated_by_agent(base, engine):
+        raise ValueError(
+            f"Instrumentation is not supported by the {engine} engine"
+        )
+
+    if engine in ("batch", "population") and base < 3:
+        batch = BatchAgent(BatchMAB(agent.mab, trials), agent.p0)
+        if base == 0:
+            batch.first_strategy()
+        else:
+            batch.baseline_strategy(random=base == 1)
+
+        return batch.mab.value, int(np.sum(batch.mab.payoff != 0))
+
+    # The other strategies only exist with fixed time steps, falling back
+    # to them would silently change the model
+    if engine in ("continuous", "adaptive") and base != 0:
+        raise ValueError(
+            f"The {engine} engine only supports the optimal strategy"
+        )
+
+    if engine == "continuous":
+        vals, payoff = continuous.simulate(agent.mab, agent.p0, trials)
+
+        return vals, int(np.sum(payoff != 0))
+
+    if engine not in (
+        "scalar",
+        "compiled",
+        "batch",
+        "population",
+        "continuous",
+        "adaptive",
+    ):
+        raise ValueError(f"Unknown engine: {engine}")
+
+    # The baseline strategies are only available in the scalar and batch
+    # engines, the compiled engine only replaces the optimal strategy and
+    # the belief per arm is only available in the scalar engine
+    vals = []
+    success = 0
+    for _ in range(trials):
+        if base == 1:
+            agent.baseline_strategy()
+        elif base == 2:
+            agent.baseline_strategy(random=False)
+        elif base == 3:
+            agent.arm_strategy()
+        elif engine == "compiled":
+            agent.compiled_strategy()
+        elif engine == "adaptive":
+            agent.adaptive_strategy(tol=ADAPTIVE_TOL)
+        else:
+            agent.first_strategy()
+        vals.append(agent.mab.value)
+
+        if agent.mab.payoff != 0:
+            success += 1
+
+        agent.reset()
+
+    return np.array(vals), success
+
+
+def simulated_by_agent(base, engine):
+    """
+    Whether run_trials simulates the trials with the strategies of the
+    Agent, which are recorded by its Instrumentation object. The batch,
+    population and continuous engines bypass the Agent, except that the
+    belief per arm (base 3) always runs on the Agent.
+    """
+    if engine in ("batch", "population"):
+        return base == 3
+
+    return engine != "continuous"
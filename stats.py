@@ -0,0 +1,85 @@
+"""
+Author: Mara van der Meulen
+---
+This file contains a class to accumulate statistics of the eventual
+values of trials without storing every value.
+"""
+import numpy as np
+
+
+class RunningStats:
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.successes = 0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, value, success=False):
+        """
+        Add the value of a single trial using Welford's algorithm.
+        """
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+        self.successes += int(success)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def update_batch(self, values, successes=0):
+        """
+        Add the values of a batch of trials, together with the number
+        of successes among them.
+        """
+        values = np.asarray(values, dtype=float)
+        if len(values) == 0:
+            return
+
+        batch = RunningStats()
+        batch.count = len(values)
+        batch.mean = np.mean(values)
+        batch.m2 = np.sum((values - batch.mean) ** 2)
+        batch.successes = int(successes)
+        batch.min = np.min(values)
+        batch.max = np.max(values)
+
+        self.merge(batch)
+
+    def merge(self, other):
+        """
+        Merge the statistics of another set of trials into these.
+        """
+        if other.count == 0:
+            return self
+
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta**2 * self.count * other.count / count
+        self.count = count
+
+        self.successes += other.successes
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+        return self
+
+    @property
+    def var(self):
+        """
+        Population variance of the values, as computed by np.var.
+        """
+        return self.m2 / self.count if self.count > 0 else np.nan
+
+    @property
+    def std(self):
+        return np.sqrt(self.var)
+
+    def ci(self):
+        """
+        Half-width of the 95% confidence interval of the mean.
+        """
+        return 2 * self.std / np.sqrt(self.count)
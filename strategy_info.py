@@ -7,130 +7,169 @@ or once with possibility of succes general and once with
 possibility of success individual per arm.
 """
 import numpy as np
-import matplotlib.pyplot as plt
 
-from agent import Agent
 from mab import MAB
+from result_store import ResultStore
+from sweep import paired_curves, sweep_stats
 import arm_settings as arm
+import plotting
 
-# Set random seed for reproducibility
-np.random.seed(56)
+P_VALS = np.linspace(0, 1, 41)[:-1]
 
-trials = 20000
-p_vals = np.linspace(0, 1, 41)[:-1]
-N = 20
+EXPERIMENTS = {
+    "info": (
+        ("without information", dict(info=False)),
+        ("information source", dict(info=True)),
+    ),
+    "b_ind": (
+        ("general possibility", dict(b_ind=False)),
+        ("possibility per arm", dict(b_ind=True)),
+    ),
+}
 
-# Choose mode "identical", "random", "specific"
-arm_mode = "specific"
-if arm_mode == "identical":
-    payoff_per_arm, cost_per_arm, rate_per_arm = arm.setting_a()
-elif arm_mode == "random":
-    payoff_per_arm, cost_per_arm, rate_per_arm = arm.setting_b(N)
-else:
-    payoff_per_arm, cost_per_arm, rate_per_arm = arm.setting_c(N)
 
-# Choose experiment "info" or "b_ind"
-experiment = "info"
-
-
-def plot_values(
-    N,
-    payoff_per_arm,
-    cost_per_arm,
-    rate_per_arm,
-    label,
-    info=False,
-    b_ind=False,
+def model(
+    N, payoff_per_arm, cost_per_arm, rate_per_arm, info=False, b_ind=False
 ):
     """
-    Plot the average eventual value where the MAB model is set with the
-    specified parameters and settings.
+    MAB model with the specified settings.
     """
-    mab = MAB(
+    return MAB(
         N,
         payoff_per_arm,
         cost_per_arm,
         rate_per_arm,
         info=info,
-        source=(np.max(payoff_per_arm - cost_per_arm / rate_per_arm) * 0.2, 1),
+        source=(
+            np.max(payoff_per_arm - cost_per_arm / rate_per_arm) * 0.2,
+            1,
+        ),
         b_ind=b_ind,
     )
 
-    agent = Agent(mab, 0.5)
-
-    # Run experiment
-    data = []
-    for p in p_vals:
-        agent.p0 = p
-        agent.reset()
 
-        vals = []
-        success = 0
-        for _ in range(trials):
-            agent.first_strategy()
-            vals.append(agent.mab.value)
-
-            if agent.mab.payoff != 0:
-                success += 1
-
-            agent.reset()
-        data.append(vals)
-        print(f"Successes: {success}/{trials}")
+def run_values(
+    N,
+    payoff_per_arm,
+    cost_per_arm,
+    rate_per_arm,
+    info=False,
+    b_ind=False,
+    trials=20000,
+    p_vals=P_VALS,
+    engine="scalar",
+    workers=None,
+    target=None,
+    progress=None,
+    cache_dir=None,
+    seed=56,
+    log=True,
+):
+    """
+    Compute the average eventual value where the MAB model is set with the
+    specified parameters and settings. If the possibility of success is
+    arm dependent, the agent keeps a belief per arm, see
+    Agent.arm_strategy.
+    Returns: a RunningStats object for every initial belief.
+    """
+    mab = model(
+        N, payoff_per_arm, cost_per_arm, rate_per_arm, info=info, b_ind=b_ind
+    )
 
-    avg_value = np.mean(data, axis=1)
-    std_value = np.std(data, axis=1)
-    plt.errorbar(
+    return sweep_stats(
+        mab,
         p_vals,
-        avg_value,
-        yerr=2 * std_value / np.sqrt(trials),
-        fmt=".",
-        label=label,
+        trials,
+        base=3 if b_ind else 0,
+        engine=engine,
+        workers=workers,
+        seed=seed,
+        target=target,
+        progress=progress,
+        store=ResultStore(cache_dir) if cache_dir else None,
+        log=log,
     )
 
 
-# Plot the results
-_ = plt.figure(figsize=(8, 5))
-if experiment == "info":
-    plot_values(
-        N,
-        payoff_per_arm,
-        cost_per_arm,
-        rate_per_arm,
-        "without information",
-        info=False,
-    )
-    plot_values(
-        N,
-        payoff_per_arm,
-        cost_per_arm,
-        rate_per_arm,
-        "information source",
-        info=True,
-    )
-else:
-    plot_values(
-        N,
-        payoff_per_arm,
-        cost_per_arm,
-        rate_per_arm,
-        "general possibility",
-        b_ind=False,
-    )
-    plot_values(
-        N,
-        payoff_per_arm,
-        cost_per_arm,
-        rate_per_arm,
-        "possibility per arm",
-        b_ind=True,
-    )
+def run(
+    experiment="info",
+    arm_mode="specific",
+    N=20,
+    trials=20000,
+    p_vals=P_VALS,
+    engine="scalar",
+    workers=None,
+    target=None,
+    progress=None,
+    cache_dir=None,
+    seed=56,
+    log=True,
+    common=False,
+):
+    """
+    Run experiment "info" or "b_ind", see first_strategy.run for the
+    remaining options and baseline.run for common.
+    Returns: the initial beliefs, a (label, RunningStats objects) pair
+    for both model variants and a list of such pairs for the paired
+    differences, which is empty unless common is set.
+    """
+    # Set random seed for reproducibility
+    np.random.seed(seed)
+
+    payoff_per_arm, cost_per_arm, rate_per_arm = arm.setting(arm_mode, N)
+
+    if common:
+        mabs = [
+            model(N, payoff_per_arm, cost_per_arm, rate_per_arm, **v)
+            for _, v in EXPERIMENTS[experiment]
+        ]
+        variants = [(mab, 3 if mab.b_ind else 0, False) for mab in mabs]
+        labels = [label for label, _ in EXPERIMENTS[experiment]]
+        curves, differences = paired_curves(
+            labels,
+            variants,
+            p_vals,
+            trials,
+            engine=engine,
+            workers=workers,
+            seed=seed,
+            log=log,
+            target=target,
+            progress=progress,
+            cache_dir=cache_dir,
+        )
+
+        return p_vals, curves, differences
+
+    curves = []
+    for label, variant in EXPERIMENTS[experiment]:
+        stats = run_values(
+            N,
+            payoff_per_arm,
+            cost_per_arm,
+            rate_per_arm,
+            trials=trials,
+            p_vals=p_vals,
+            engine=engine,
+            workers=workers,
+            target=target,
+            progress=progress,
+            cache_dir=cache_dir,
+            seed=seed,
+            log=log,
+            **variant,
+        )
+        curves.append((label, stats))
+
+    return p_vals, curves, []
+
+
+def plot(result, out=None):
+    """
+    Plot the results of run, the figure is saved to out if it is set.
+    """
+    plotting.plot_curves(result, out)
 
-plt.xticks(p_vals[::4])
 
-plt.title(
-    "Agent's strategy based on Theorem 1 in Multi-Armed Exponential Bandit [Chen et al]"
-)
-plt.xlabel("initial belief $p$")
-plt.ylabel("value")
-plt.legend()
-plt.show()
+if __name__ == "__main__":
+    plot(run())
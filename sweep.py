@@ -0,0 +1,727 @@
+"""
+Author: Mara van der Meulen
+---
+This file contains functions to run an experiment for a range of
+initial beliefs, either serially or spread over a pool of processes.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import copy
+import time
+
+import numpy as np
+
+from agent import Agent
+from batch import BatchAgent, BatchMAB
+from result_store import code_version
+from simulation import run_trials, simulated_by_agent
+from stats import RunningStats
+from variates import CommonVariates, Variates
+
+
+def run_sweep(
+    mab,
+    p_vals,
+    trials,
+    base=0,
+    priori=False,
+    engine="scalar",
+    workers=None,
+    chunk=1000,
+    seed=56,
+    log=False,
+    target=None,
+    relative=False,
+    store=None,
+):
+    """
+    Run trials for every initial belief in p_vals. The priori parameter
+    specifies whether the a priori probability should match the initial
+    belief. Without workers the trials run serially on the random state
+    of the model. Otherwise the trials are split into chunks, each with
+    its own Generator spawned from the seed, so that results do not
+    depend on the number of workers. See sweep_stats for the target and
+    the store.
+    Returns: the average value, the standard deviation of the value and
+    the number of successes for every initial belief.
+    """
+    stats = sweep_stats(
+        mab,
+        p_vals,
+        trials,
+        base=base,
+        priori=priori,
+        engine=engine,
+        workers=workers,
+        chunk=chunk,
+        seed=seed,
+        log=log,
+        target=target,
+        relative=relative,
+        store=store,
+    )
+
+    avg_value = np.array([s.mean for s in stats])
+    std_value = np.array([s.std for s in stats])
+    successes = np.array([s.successes for s in stats])
+
+    return avg_value, std_value, successes
+
+
+def sweep_stats(
+    mab,
+    p_vals,
+    trials,
+    base=0,
+    priori=False,
+    engine="scalar",
+    workers=None,
+    chunk=1000,
+    seed=56,
+    log=False,
+    target=None,
+    relative=False,
+    store=None,
+    instrument=None,
+    progress=None,
+):
+    """
+    Same as run_sweep, but the values are accumulated chunk by chunk in
+    streaming statistics instead of being stored. If a target is given,
+    chunks are only run for initial beliefs whose 95% confidence interval
+    half-width still exceeds the target (relative to the absolute mean if
+    relative is set), and trials is the maximal number of trials per
+    initial belief. Chunks then always use their own Generator. If a
+    ResultStore is given, initial beliefs with stored results for the
+    same configuration are loaded instead of simulated, again using
+    chunks with their own Generator. An Instrumentation object records
+    the trials, which must run serially in this process, without
+    workers, a target, a store or progress, and be simulated by the
+    Agent, see simulation.simulated_by_agent. With
+    engine "population" the serial trials of all initial beliefs are
+    simulated at once, see _population_sweep. If progress is set, chunks
+    with their own Generator are run through iter_sweep and a snapshot
+    is logged every progress seconds, see follow, so that the sweep can
+    be interrupted while keeping the partial results. The snapshots are
+    logged even if log is not set, which only controls the final
+    successes. Partial results cannot be stored, so progress cannot be
+    combined with a store.
+    Returns: a RunningStats object for every initial belief.
+    """
+    args = (base, priori, engine, workers, chunk, seed, target, relative)
+
+    if store is not None and progress is not None:
+        raise ValueError("Progress snapshots cannot be used with a store")
+    if instrument is not None and (
+        store is not None
+        or progress is not None
+        or target is not None
+        or workers is not None
+    ):
+        raise ValueError(
+            "Instrumentation requires a serial sweep in this process"
+        )
+    if instrument is not None and not simulated_by_agent(base, engine):
+        raise ValueError(
+            f"Instrumentation is not supported by the {engine} engine"
+        )
+
+    if store is not None:
+        stats = _stored_sweep(store, mab, p_vals, trials, *args)
+    elif progress is not None:
+        snapshots = iter_sweep(mab, p_vals, trials, *args, interval=progress)
+        stats = follow(snapshots).stats
+    elif workers is None and target is None and engine == "population":
+        return _population_sweep(
+            mab, p_vals, trials, base, priori, chunk, log, instrument
+        )
+    elif workers is None and target is None:
+        return _serial_sweep(
+            mab, p_vals, trials, base, priori, engine, chunk, log, instrument
+        )
+    else:
+        stats = _chunked_sweep(mab, p_vals, trials, *args)
+
+    if log:
+        for s in stats:
+            print(f"Successes: {s.successes}/{s.count}")
+
+    return stats
+
+
+def iter_sweep(
+    mab,
+    p_vals,
+    trials,
+    base=0,
+    priori=False,
+    engine="scalar",
+    workers=None,
+    chunk=1000,
+    seed=56,
+    target=None,
+    relative=False,
+    every=None,
+    interval=None,
+):
+    """
+    Run the sweep of sweep_stats with chunks of their own Generator, one
+    round of chunks for all initial beliefs at a time, and yield the
+    statistics so far. A snapshot is yielded once at least every trials
+    have been run or interval seconds have passed since the previous
+    one, after every round if neither is set, and always after the last
+    round. The statistics are the same as those of sweep_stats with a
+    target or workers, and stopping the iteration early cancels the
+    remaining rounds.
+    Returns: a generator of Snapshot objects.
+    """
+    stats = [RunningStats() for _ in p_vals]
+    rounds = _chunk_rounds(
+        stats,
+        mab,
+        p_vals,
+        trials,
+        base,
+        priori,
+        engine,
+        workers,
+        chunk,
+        seed,
+        target,
+        relative,
+    )
+
+    start = time.perf_counter()
+    last = Snapshot(copy.deepcopy(stats), len(p_vals) * trials, 0.0)
+    pending = False
+    for _ in rounds:
+        now = time.perf_counter() - start
+        snapshot = Snapshot(copy.deepcopy(stats), last.total, now)
+        pending = True
+
+        due = every is None and interval is None
+        if every is not None and snapshot.trials - last.trials >= every:
+            due = True
+        if interval is not None and now - last.elapsed >= interval:
+            due = True
+
+        if due:
+            yield snapshot
+            last = snapshot
+            pending = False
+
+    if pending or last.trials == 0:
+        yield snapshot if pending else last
+
+
+class Snapshot:
+    def __init__(self, stats, total, elapsed):
+        """
+        Statistics of a sweep after elapsed seconds, with a RunningStats
+        object for every initial belief, out of at most total trials.
+        """
+        self.stats = stats
+        self.total = total
+        self.elapsed = elapsed
+
+    @property
+    def trials(self):
+        """
+        Number of trials run over all initial beliefs.
+        """
+        return sum(s.count for s in self.stats)
+
+    @property
+    def count(self):
+        return np.array([s.count for s in self.stats])
+
+    @property
+    def mean(self):
+        return np.array([s.mean for s in self.stats])
+
+    def ci(self):
+        """
+        Half-width of the 95% confidence interval for every initial
+        belief, nan if it has fewer than two trials.
+        """
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.array(
+                [s.ci() if s.count > 1 else np.nan for s in self.stats]
+            )
+
+    @property
+    def success_rate(self):
+        """
+        Fraction of the trials with a breakthrough for every initial
+        belief, nan if it has no trials.
+        """
+        successes = np.array([s.successes for s in self.stats])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return successes / self.count
+
+
+def follow(snapshots, log=True):
+    """
+    Consume the snapshots of iter_sweep, printing the progress of each if
+    log is set. An interrupt (Ctrl-C) stops the sweep, the last snapshot
+    is then kept.
+    Returns: the last snapshot.
+    """
+    snapshot = None
+    try:
+        for snapshot in snapshots:
+            if log:
+                print(
+                    f"Trials: {snapshot.trials}/{snapshot.total}, "
+                    f"max CI: {np.nanmax(snapshot.ci(), initial=0):.4g}, "
+                    f"{snapshot.elapsed:.1f}s"
+                )
+    except KeyboardInterrupt:
+        snapshots.close()
+        if snapshot is None:
+            raise
+        if log:
+            print(f"Interrupted after {snapshot.trials} trials")
+
+    return snapshot
+
+
+def paired_sweep(
+    variants,
+    p_vals,
+    trials,
+    engine="scalar",
+    workers=None,
+    chunk=1000,
+    seed=56,
+    log=False,
+):
+    """
+    Run trials for every initial belief and every variant, given as a
+    (mab, base, priori) tuple, with common random numbers: trial t of
+    every variant uses the same random variates, see CommonVariates.
+    Differences between the variants are then estimated from paired
+    trials, with much less noise than from independent runs. Trials are
+    simulated one by one, so only the scalar engine is supported. See
+    run_sweep for the workers and chunks.
+    Returns: a RunningStats object for every variant and initial belief,
+    and for every variant after the first the statistics of its paired
+    difference in value with the first variant.
+    """
+    if engine != "scalar":
+        raise ValueError("Common random numbers require the scalar engine")
+
+    stats = [[RunningStats() for _ in p_vals] for _ in variants]
+    differences = [[RunningStats() for _ in p_vals] for _ in variants[1:]]
+
+    # Workers receive the variants once, see _init_worker
+    pool = workers is not None and workers > 1
+    tasks = [
+        (j, None if pool else variants, p, size, _stream(seed, p, c))
+        for c, size in enumerate(_chunk_sizes(trials, chunk))
+        for j, p in enumerate(p_vals)
+    ]
+    if pool:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(variants,),
+        ) as executor:
+            results = list(executor.map(_run_paired_chunk, tasks))
+    else:
+        results = map(_run_paired_chunk, tasks)
+
+    for task, (chunk_stats, chunk_differences) in zip(tasks, results):
+        j = task[0]
+        for v, s in enumerate(chunk_stats):
+            stats[v][j].merge(s)
+        for v, s in enumerate(chunk_differences):
+            differences[v][j].merge(s)
+
+    if log:
+        for v in range(len(variants)):
+            for s in stats[v]:
+                print(f"Successes: {s.successes}/{s.count}")
+
+    return stats, differences
+
+
+def paired_curves(
+    labels,
+    variants,
+    p_vals,
+    trials,
+    engine="scalar",
+    workers=None,
+    seed=56,
+    log=False,
+    target=None,
+    progress=None,
+    cache_dir=None,
+):
+    """
+    Run paired_sweep for the variants and label the results for
+    plotting.plot_curves. The target, progress and cache_dir options of
+    the experiments are not supported with common random numbers, and
+    are rejected if they are set.
+    Returns: a (label, RunningStats objects) pair for every variant and
+    for every variant after the first a pair for its paired difference
+    with the first variant.
+    """
+    options = dict(target=target, progress=progress, cache_dir=cache_dir)
+    unsupported = sorted(k for k, v in options.items() if v is not None)
+    if unsupported:
+        raise ValueError(
+            f"Options not supported with common random numbers: {unsupported}"
+        )
+
+    stats, paired = paired_sweep(
+        variants,
+        p_vals,
+        trials,
+        engine=engine,
+        workers=workers,
+        seed=seed,
+        log=log,
+    )
+
+    curves = list(zip(labels, stats))
+    differences = [
+        (f"{label} - {labels[0]}", s) for label, s in zip(labels[1:], paired)
+    ]
+
+    return curves, differences
+
+
+def experiment_config(
+    mab, trials, base, priori, engine, chunk, seed, target, relative
+):
+    """
+    Full configuration of an experiment, which determines its results.
+    """
+    return dict(
+        payoff=mab.arm_payoff,
+        cost=mab.arm_cost,
+        rate=mab.arm_rate,
+        N=mab.N,
+        dt=mab.dt,
+        b_ind=mab.b_ind,
+        priori=mab.priori,
+        matched_priori=priori,
+        base=base,
+        engine=engine,
+        trials=trials,
+        chunk=chunk,
+        seed=seed,
+        target=target,
+        relative=relative,
+        code=code_version(),
+    )
+
+
+def converged(stats, target, relative=False):
+    """
+    Whether the 95% confidence interval of the mean is within the target.
+    """
+    if stats.count < 2:
+        return False
+    if relative:
+        return stats.ci() <= target * abs(stats.mean)
+
+    return stats.ci() <= target
+
+
+def _chunk_sizes(trials, chunk):
+    """
+    Split the trials into chunks of at most chunk trials.
+    """
+    return [min(chunk, trials - start) for start in range(0, trials, chunk)]
+
+
+def _serial_sweep(
+    mab, p_vals, trials, base, priori, engine, chunk, log, instrument=None
+):
+    """
+    Run all trials in this process, one initial belief at a time. The
+    trials use the random state of the model, but a copy of the model so
+    that the a priori probability of the caller is not changed.
+    """
+    agent = Agent(copy.copy(mab), 0.5, history="none", instrument=instrument)
+
+    stats = []
+    for p in p_vals:
+        agent.p0 = p
+        if priori:
+            agent.mab.priori = p
+        agent.reset()
+
+        point = RunningStats()
+        for size in _chunk_sizes(trials, chunk):
+            vals, success = run_trials(agent, size, base=base, engine=engine)
+            point.update_batch(vals, success)
+        stats.append(point)
+
+        if log:
+            print(f"Successes: {point.successes}/{point.count}")
+
+    return stats
+
+
+def _population_sweep(
+    mab, p_vals, trials, base, priori, chunk, log, instrument=None
+):
+    """
+    Run the trials of all initial beliefs at once, as a population of
+    (initial belief, trial) agents per chunk of trials. Every agent has
+    its own initial belief, a priori probability and success draws.
+    """
+    if base == 3:
+        return _serial_sweep(
+            mab, p_vals, trials, base, priori, "scalar", chunk, log, instrument
+        )
+
+    stats = [RunningStats() for _ in p_vals]
+    for size in _chunk_sizes(trials, chunk):
+        rows = np.repeat(np.asarray(p_vals, dtype=float), size)
+        population = BatchAgent(
+            BatchMAB(mab, len(rows), priori=rows if priori else None), rows
+        )
+        if base == 0:
+            population.first_strategy()
+        else:
+            population.baseline_strategy(random=base == 1)
+
+        values = population.mab.value.reshape(len(p_vals), size)
+        hits = (population.mab.payoff != 0).reshape(len(p_vals), size)
+        for j, point in enumerate(stats):
+            point.update_batch(values[j], np.sum(hits[j]))
+
+    if log:
+        for s in stats:
+            print(f"Successes: {s.successes}/{s.count}")
+
+    return stats
+
+
+def _stored_sweep(
+    store,
+    mab,
+    p_vals,
+    trials,
+    base,
+    priori,
+    engine,
+    workers,
+    chunk,
+    seed,
+    target,
+    relative,
+):
+    """
+    Load stored results and only simulate the missing initial beliefs.
+    """
+    config = experiment_config(
+        mab, trials, base, priori, engine, chunk, seed, target, relative
+    )
+
+    stats = [store.load(config, p) for p in p_vals]
+    missing = [j for j, s in enumerate(stats) if s is None]
+    if missing:
+        computed = _chunked_sweep(
+            mab,
+            [p_vals[j] for j in missing],
+            trials,
+            base,
+            priori,
+            engine,
+            workers,
+            chunk,
+            seed,
+            target,
+            relative,
+        )
+        for j, s in zip(missing, computed):
+            store.save(config, p_vals[j], s)
+            stats[j] = s
+
+    return stats
+
+
+def _stream(seed, p, c):
+    """
+    Random stream of chunk c for initial belief p, which does not depend
+    on the other initial beliefs in the sweep.
+    """
+    key = int(np.float64(p).view(np.uint64))
+
+    return np.random.SeedSequence(seed, spawn_key=(key, c))
+
+
+def _chunked_sweep(
+    mab,
+    p_vals,
+    trials,
+    base,
+    priori,
+    engine,
+    workers,
+    chunk,
+    seed,
+    target,
+    relative,
+):
+    """
+    Run the trials as (initial belief, chunk) tasks, see _chunk_rounds.
+    """
+    stats = [RunningStats() for _ in p_vals]
+    for _ in _chunk_rounds(
+        stats,
+        mab,
+        p_vals,
+        trials,
+        base,
+        priori,
+        engine,
+        workers,
+        chunk,
+        seed,
+        target,
+        relative,
+    ):
+        pass
+
+    return stats
+
+
+def _chunk_rounds(
+    stats,
+    mab,
+    p_vals,
+    trials,
+    base,
+    priori,
+    engine,
+    workers,
+    chunk,
+    seed,
+    target,
+    relative,
+):
+    """
+    Run the trials as (initial belief, chunk) tasks, over a process pool
+    if there is more than one worker, merging them into stats. Tasks are
+    submitted one round of chunks at a time, leaving out initial beliefs
+    that reached the target.
+    Returns: a generator that yields after every round.
+    """
+    # Workers receive the model once, see _init_worker
+    executor = None
+    if workers is not None and workers > 1:
+        executor = ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(mab,)
+        )
+
+    try:
+        for c, size in enumerate(_chunk_sizes(trials, chunk)):
+            tasks = []
+            for j, p in enumerate(p_vals):
+                if target is not None and converged(
+                    stats[j], target, relative
+                ):
+                    continue
+
+                stream = _stream(seed, p, c)
+                model = None if executor is not None else mab
+                tasks.append((j, model, p, size, base, priori, engine, stream))
+
+            if not tasks:
+                break
+
+            if executor is not None:
+                results = executor.map(_run_chunk, tasks)
+            else:
+                results = map(_run_chunk, tasks)
+
+            # Merge the chunks of every initial belief in task order
+            for task, result in zip(tasks, results):
+                stats[task[0]].merge(result)
+
+            yield
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+
+def _init_worker(model):
+    """
+    Keep the model of the experiment, or the variants of a paired sweep,
+    in a worker process. Tasks then do not carry the model, which is only
+    sent once per worker instead of with every chunk.
+    """
+    global _worker_model
+    _worker_model = model
+
+
+# Model set by _init_worker in a worker process
+_worker_model = None
+
+
+def _run_chunk(task):
+    """
+    Run a single chunk of trials with its own random stream, on the model
+    of the worker if the task has none.
+    Returns: the statistics of the chunk.
+    """
+    _, mab, p, size, base, priori, engine, stream = task
+    if mab is None:
+        mab = _worker_model
+
+    # Work on a copy, the model may belong to the calling process
+    mab = copy.copy(mab)
+    mab.random = Variates(np.random.default_rng(stream))
+
+    agent = Agent(mab, p, history="none")
+    if priori:
+        agent.mab.priori = p
+    agent.reset()
+
+    vals, success = run_trials(agent, size, base=base, engine=engine)
+    stats = RunningStats()
+    stats.update_batch(vals, success)
+
+    return stats
+
+
+def _run_paired_chunk(task):
+    """
+    Run a single chunk of trials for every variant, using common random
+    numbers drawn from the stream of the chunk, with the variants of the
+    worker if the task has none.
+    Returns: the statistics of every variant and of the paired
+    differences with the first variant.
+    """
+    _, variants, p, size, stream = task
+    if variants is None:
+        variants = _worker_model
+
+    values = []
+    stats = []
+    for mab, base, priori in variants:
+        mab = copy.copy(mab)
+        mab.random = CommonVariates(stream, size)
+
+        agent = Agent(mab, p, history="none")
+        if priori:
+            agent.mab.priori = p
+        agent.reset()
+
+        vals, success = run_trials(agent, size, base=base)
+        values.append(vals)
+        stats.append(RunningStats())
+        stats[-1].update_batch(vals, success)
+
+    differences = []
+    for vals in values[1:]:
+        differences.append(RunningStats())
+        differences[-1].update_batch(vals - values[0])
+
+    return stats, differences
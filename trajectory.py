@@ -0,0 +1,96 @@
+"""
+Author: Mara van der Meulen
+---
+This file contains the agent's belief trajectories while following the
+optimal strategy in discrete time, computed for many time step sizes at
+once without simulating breakthroughs. Until a breakthrough occurs the
+chosen arms and the beliefs are deterministic, so they follow from the
+arm schedule in continuous time.
+"""
+import numpy as np
+
+from continuous import logit, schedule
+
+
+def step_counts(mab, p0, dt_vals, arms, durations):
+    """
+    Number of time steps of size dt spent on every arm of the schedule
+    by Agent.first_strategy, which chooses the arm at the start of each
+    step. In log-odds the Bayesian belief decreases linearly, by
+    lambda_i dt per step.
+    Returns: an array with a row for every arm and a column for every dt.
+    """
+    dt = np.asarray(dt_vals, dtype=float)
+    rates = mab.arm_rate[arms]
+
+    # Lower bounds of the segments of the schedule in log-odds
+    bounds = logit(p0) - np.cumsum(rates * durations)
+
+    x = np.full(len(dt), logit(p0))
+    counts = np.zeros((len(arms), len(dt)), dtype=int)
+    for k in range(len(arms)):
+        counts[k], x = segment_steps(x, bounds[k], rates[k] * dt)
+
+    return counts
+
+
+def segment_steps(x, lower, step):
+    """
+    Number of steps of size step in log-odds taken from the beliefs x
+    while they are above lower, the arm is chosen at the start of each
+    step so the last step may end below lower.
+    Returns: the number of steps and the beliefs after them, in log-odds.
+    """
+    n = np.maximum(np.ceil((x - lower) / step), 0)
+
+    return n, x - n * step
+
+
+def beliefs(mab, p0, dt_vals, arms=None, durations=None):
+    """
+    Beliefs of the optimal strategy for every time step size in dt_vals,
+    using Bayesian updates (Equation 2.11) and adaptations of the
+    previous belief (Equation 2.12). The schedule is computed with
+    continuous.schedule unless it is given.
+    Returns: the number of beliefs for every dt, and the times, Bayesian
+    beliefs and adapted beliefs with a row for every dt, padded with nan.
+    """
+    if arms is None:
+        arms, durations = schedule(mab, p0)
+    dt = np.asarray(dt_vals, dtype=float)
+    rates = mab.arm_rate[arms]
+
+    counts = step_counts(mab, p0, dt, arms, durations)
+    lengths = np.sum(counts, axis=0) + 1
+    width = np.max(lengths)
+
+    # Rate of every step, built from the changes in rate at the start of
+    # each segment, zero after the agent quits
+    change = np.zeros((len(dt), width))
+    starts = np.cumsum(counts, axis=0) - counts
+    delta = np.diff(np.concatenate(([0], rates, [0])))
+    rows = np.broadcast_to(np.arange(len(dt)), (len(arms) + 1, len(dt)))
+    cols = np.concatenate((starts, lengths[None] - 1))
+    np.add.at(change, (rows, cols), delta[:, None])
+    step_rate = np.cumsum(change, axis=1)[:, :-1]
+
+    # Bayesian updates
+    exponent = np.zeros((len(dt), width))
+    np.cumsum(step_rate * dt[:, None], axis=1, out=exponent[:, 1:])
+    prob = p0 * np.exp(-exponent)
+    p_bay = prob / (prob + (1 - p0))
+
+    # Adaptations, sequential in the steps but vectorized over dt
+    p_upd = np.empty((len(dt), width))
+    p_upd[:, 0] = p0
+    for j in range(width - 1):
+        prev = p_upd[:, j]
+        p_upd[:, j + 1] = prev - (prev * (1 - prev) * step_rate[:, j] * dt)
+
+    times = np.arange(width) * dt[:, None]
+
+    padding = np.arange(width) >= lengths[:, None]
+    for values in (times, p_bay, p_upd):
+        values[padding] = np.nan
+
+    return lengths, times, p_bay, p_upd
@@ -0,0 +1,252 @@
+"""
+Author: Mara van der Meulen
+---
+This file contains a store for belief paths of varying length. The paths
+are kept in a compressed sparse row layout, the values of all paths in
+one flat array and the start of every path in an offsets array, either
+in memory or in memory-mapped files. Reductions over the paths are
+computed block by block without padding them to a common length.
+"""
+import json
+import os
+
+import numpy as np
+
+
+class TrajectoryStore:
+    def __init__(self, directory=None, capacity=2**16, block=2**22):
+        """
+        Empty store, backed by memory-mapped files in directory if it is
+        set. The arrays grow when full, reductions process at most about
+        block values at once.
+        """
+        self.directory = directory
+        self.block = block
+        self.count = 0
+        self.size = 0
+
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+        self.values = self._array("values", float, capacity)
+        self.offsets = self._array("offsets", np.int64, capacity + 1)
+        self.offsets[0] = 0
+
+    @classmethod
+    def open(cls, directory, block=2**22):
+        """
+        Open a store saved in directory with flush, to which paths can
+        be appended.
+        """
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+
+        store = cls.__new__(cls)
+        store.directory = directory
+        store.block = block
+        store.count = meta["count"]
+        store.size = meta["size"]
+        store.values = store._map("values", float)
+        store.offsets = store._map("offsets", np.int64)
+
+        return store
+
+    def _path(self, name):
+        return os.path.join(self.directory, name + ".bin")
+
+    def _map(self, name, dtype, length=None):
+        """
+        Memory-map a file of the store, resized to length if it is set.
+        """
+        path = self._path(name)
+        if length is not None:
+            with open(path, "ab") as f:
+                f.truncate(length * np.dtype(dtype).itemsize)
+
+        return np.memmap(path, dtype=dtype, mode="r+")
+
+    def _array(self, name, dtype, length):
+        if self.directory is None:
+            return np.empty(length, dtype=dtype)
+
+        return self._map(name, dtype, length)
+
+    def _grow(self, name, length):
+        """
+        Make room for at least length entries in the values or offsets.
+        """
+        array = getattr(self, name)
+        if length <= len(array):
+            return
+
+        length = max(length, 2 * len(array))
+        if self.directory is None:
+            array = np.resize(array, length)
+        else:
+            array.flush()
+            del array
+            array = self._map(name, getattr(self, name).dtype, length)
+        setattr(self, name, array)
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def lengths(self):
+        """
+        Number of values of every path.
+        """
+        return np.diff(self.offsets[: self.count + 1])
+
+    def path(self, i):
+        """
+        Values of path i, as a view into the store.
+        """
+        return self.values[self.offsets[i] : self.offsets[i + 1]]
+
+    def append(self, values):
+        """
+        Append a single path.
+        """
+        values = np.asarray(values, dtype=float)
+        self._grow("values", self.size + len(values))
+        self._grow("offsets", self.count + 2)
+
+        self.values[self.size : self.size + len(values)] = values
+        self.size += len(values)
+        self.count += 1
+        self.offsets[self.count] = self.size
+
+    def append_padded(self, values, lengths):
+        """
+        Append the rows of a padded array as paths, row i holds a path of
+        lengths[i] values followed by padding.
+        """
+        values = np.asarray(values, dtype=float)
+        lengths = np.asarray(lengths, dtype=np.int64)
+        total = int(np.sum(lengths))
+        self._grow("values", self.size + total)
+        self._grow("offsets", self.count + len(lengths) + 1)
+
+        mask = np.arange(values.shape[1]) < lengths[:, None]
+        self.values[self.size : self.size + total] = values[mask]
+        self.offsets[self.count + 1 : self.count + len(lengths) + 1] = (
+            self.size + np.cumsum(lengths)
+        )
+        self.size += total
+        self.count += len(lengths)
+
+    def flush(self):
+        """
+        Write a memory-mapped store to disk, so that it can be opened
+        again with open.
+        """
+        if self.directory is None:
+            return
+
+        self.values.flush()
+        self.offsets.flush()
+        with open(os.path.join(self.directory, "meta.json"), "w") as f:
+            json.dump(dict(count=self.count, size=self.size), f)
+
+    def _blocks(self):
+        """
+        Split the paths into consecutive blocks of about self.block values.
+        Returns: a generator of (first path, end path, values, step index
+        of every value) tuples.
+        """
+        offsets = self.offsets[: self.count + 1]
+        first = 0
+        while first < self.count:
+            end = np.searchsorted(
+                offsets, offsets[first] + self.block, side="right"
+            )
+            end = min(max(end - 1, first + 1), self.count)
+
+            start, stop = offsets[first], offsets[end]
+            lengths = np.diff(offsets[first : end + 1])
+            steps = np.arange(stop - start) - np.repeat(
+                offsets[first:end] - start, lengths
+            )
+
+            yield first, end, self.values[start:stop], steps
+            first = end
+
+    def pointwise(self, reducer="mean"):
+        """
+        Reduce the values of all paths at every step, over the paths that
+        reach that step. The reducer is "mean", "max", "min" or "count".
+        Returns: an array with a value for every step of the longest path.
+        """
+        width = int(np.max(self.lengths)) if self.count else 0
+        count = np.zeros(width)
+        if reducer == "max":
+            result = np.full(width, -np.inf)
+        elif reducer == "min":
+            result = np.full(width, np.inf)
+        elif reducer in ("mean", "count"):
+            result = np.zeros(width)
+        else:
+            raise ValueError(f"Unknown reducer: {reducer}")
+
+        for _, _, values, steps in self._blocks():
+            count += np.bincount(steps, minlength=width)
+            if reducer == "max":
+                np.maximum.at(result, steps, values)
+            elif reducer == "min":
+                np.minimum.at(result, steps, values)
+            elif reducer == "mean":
+                result += np.bincount(steps, weights=values, minlength=width)
+
+        if reducer == "count":
+            return count
+        if reducer == "mean":
+            return result / count
+
+        return result
+
+    def at(self, step, lengths=None):
+        """
+        Values at the given step of the paths that reach it, lengths are
+        the lengths of the paths if they are already known.
+        """
+        if lengths is None:
+            lengths = self.lengths
+        idx = np.flatnonzero(lengths > step)
+
+        return self.values[self.offsets[idx] + step]
+
+    def quantiles(self, q, steps):
+        """
+        Quantiles q of the values at every step in steps, over the paths
+        that reach that step.
+        Returns: an array with a row for every quantile and a column for
+        every step.
+        """
+        lengths = self.lengths
+
+        return np.stack(
+            [np.quantile(self.at(step, lengths), q) for step in steps],
+            axis=-1,
+        )
+
+    def time_to_threshold(self, threshold, dt=None):
+        """
+        First step at which every path is at or below threshold, or -1 if
+        it never is. The steps are converted to times if dt is set.
+        """
+        result = np.full(self.count, -1, dtype=np.int64)
+        for first, end, values, steps in self._blocks():
+            lengths = np.diff(self.offsets[first : end + 1])
+            starts = np.cumsum(lengths) - lengths
+
+            below = np.where(
+                values <= threshold, steps, np.iinfo(np.int64).max
+            )
+            reached = np.minimum.reduceat(below, starts[lengths > 0])
+            reached[reached == np.iinfo(np.int64).max] = -1
+            result[first:end][lengths > 0] = reached
+
+        if dt is None:
+            return result
+
+        return np.where(result >= 0, result * dt, np.nan)
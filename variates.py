@@ -0,0 +1,208 @@
+"""
+Author: Mara van der Meulen
+---
+This file contains sources of random variates for the simulations. The
+default either uses the global NumPy random state, or an injected
+Generator from which single variates are drawn in pre-drawn blocks. The
+common source gives every trial its own variates, which are shared by all
+strategies and model variants that use the same seed.
+"""
+import numpy as np
+
+
+class Variates:
+    def __init__(self, rng=None, size=4096):
+        self.rng = rng
+        self.size = size
+
+        # Blocks of pre-drawn standard exponential and uniform variates
+        self._exp = []
+        self._exp_pos = 0
+        self._unif = []
+        self._unif_pos = 0
+
+    def exponential(self, scale=1.0, size=None):
+        """
+        Exponential variate(s) with the given scale.
+        """
+        if self.rng is None:
+            return np.random.exponential(scale, size)
+        if size is not None:
+            return self.rng.standard_exponential(size) * scale
+
+        if self._exp_pos == len(self._exp):
+            self._exp = self.rng.standard_exponential(self.size).tolist()
+            self._exp_pos = 0
+        self._exp_pos += 1
+
+        return self._exp[self._exp_pos - 1] * scale
+
+    def uniform(self, size=None):
+        """
+        Uniform variate(s) on [0, 1).
+        """
+        if self.rng is None:
+            return np.random.uniform(size=size)
+        if size is not None:
+            return self.rng.random(size)
+
+        if self._unif_pos == len(self._unif):
+            self._unif = self.rng.random(self.size).tolist()
+            self._unif_pos = 0
+        self._unif_pos += 1
+
+        return self._unif[self._unif_pos - 1]
+
+    def integers(self, high, size=None):
+        """
+        Uniformly distributed integer(s) in {0, ..., high - 1}.
+        """
+        if self.rng is None:
+            return np.random.randint(high, size=size)
+        if size is not None:
+            return self.rng.integers(high, size=size)
+
+        return int(self.uniform() * high)
+
+    def geometric(self, p, size=None):
+        """
+        Geometric variate(s), the number of Bernoulli(p) experiments up to
+        and including the first success.
+        """
+        if self.rng is None:
+            return np.random.geometric(p, size)
+
+        return self.rng.geometric(p, size)
+
+    def next_trial(self):
+        """
+        Called by MAB.reset when a new trial starts, only used by
+        CommonVariates.
+        """
+
+    def binomial(self, n, p, size=None):
+        """
+        Binomial variate(s) with n experiments and success probability p.
+        Bernoulli variates are drawn by comparing uniforms with p.
+        """
+        if self.rng is None:
+            return np.random.binomial(n, p, size)
+        if np.ndim(n) == 0 and n == 1:
+            return (self.uniform(size) < p) * 1
+
+        return self.rng.binomial(n, p, size)
+
+
+class CommonVariates:
+    def __init__(self, seed, trials, block=128):
+        """
+        Variates for common random numbers. Trial t (counted by next_trial,
+        starting at 0) uses row t of two tables of exponential and uniform
+        variates, so the k-th exponential variate of trial t is the same
+        for every strategy and every model variant. The tables are drawn
+        from separate streams of the SeedSequence seed, one block of
+        columns at a time, such that their values do not depend on how
+        many columns are used. The model reset after the last trial uses
+        one extra row. The success variates of a trial, one per arm, are
+        drawn on demand from a stream of their own, so that they are
+        never stored for all trials.
+        """
+        self.seed = seed
+        streams = [
+            np.random.default_rng(
+                np.random.SeedSequence(
+                    seed.entropy, spawn_key=seed.spawn_key + (k,)
+                )
+            )
+            for k in range(1, 3)
+        ]
+        self._exp = _Table(streams[0].standard_exponential, trials + 1, block)
+        self._unif = _Table(streams[1].random, trials + 1, block)
+
+        self.row = -1
+        self._exp_pos = 0
+        self._unif_pos = 0
+
+    def next_trial(self):
+        """
+        Start the next trial.
+        """
+        self.row += 1
+        self._exp_pos = 0
+        self._unif_pos = 0
+
+    def exponential(self, scale=1.0, size=None):
+        """
+        Next exponential variate of the current trial with the given scale.
+        """
+        _scalar_only(size)
+        self._exp_pos += 1
+
+        return self._exp.get(self.row, self._exp_pos - 1) * scale
+
+    def uniform(self, size=None):
+        """
+        Next uniform variate on [0, 1) of the current trial.
+        """
+        _scalar_only(size)
+        self._unif_pos += 1
+
+        return self._unif.get(self.row, self._unif_pos - 1)
+
+    def integers(self, high, size=None):
+        """
+        Uniformly distributed integer in {0, ..., high - 1}.
+        """
+        _scalar_only(size)
+
+        return int(self.uniform() * high)
+
+    def binomial(self, n, p, size=None):
+        """
+        Bernoulli variates of whether success is possible in the current
+        trial, comparing the first size success variates of the trial
+        with p. Variants with a different a priori probability are
+        therefore coupled, and arm i uses the same variate whether or
+        not success is arm dependent.
+        """
+        if n != 1 or not isinstance(size, (int, np.integer)):
+            raise ValueError(
+                "CommonVariates only supports the draws of the scalar engine"
+            )
+
+        stream = np.random.default_rng(
+            np.random.SeedSequence(
+                self.seed.entropy,
+                spawn_key=self.seed.spawn_key + (0, self.row),
+            )
+        )
+
+        return (stream.random(size) < p) * 1
+
+
+class _Table:
+    def __init__(self, draw, rows, block):
+        """
+        Table of variates with a fixed number of rows, whose columns are
+        drawn in blocks on first use.
+        """
+        self.draw = draw
+        self.rows = rows
+        self.block = block
+        self.blocks = []
+
+    def _extend(self, columns):
+        while len(self.blocks) * self.block < columns:
+            self.blocks.append(self.draw((self.rows, self.block)))
+
+    def get(self, row, col):
+        self._extend(col + 1)
+
+        return self.blocks[col // self.block][row, col % self.block]
+
+
+def _scalar_only(size):
+    if size is not None:
+        raise ValueError(
+            "CommonVariates only supports the draws of the scalar engine"
+        )